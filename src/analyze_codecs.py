@@ -9,25 +9,119 @@ Uso (CLI):
 
 Funções principais:
 - analyze_file(path) -> dict: retorna propriedades detectadas (video/audio codec, w/h, fps, duration)
+- analyze_files([paths]) -> [dict]: mesmo que analyze_file, mas roda os ffprobe em paralelo
 - can_concat_without_reencode([paths]) -> (bool, reasons): decide se concat direto é seguro
 - recommend_concat_method([paths]) -> 'concat' or 'reencode' e justificativa
+  (decisão guardada em ~/.cache/kndauto/concat_decisions.json, chaveada pelo conteúdo dos arquivos)
 
 Requisitos:
 - ffprobe (parte do ffmpeg) disponível no PATH
+- opcional: PyAV (pip install av) para analisar em processo, sem lançar ffprobe
 """
 
+import hashlib
 import json
+import os
+import shutil
 import subprocess
 import sys
-from typing import Dict, List, Tuple, Any
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+
+try:
+    # orjson é opcional; faz o parse bem mais rápido que o json da stdlib
+    import orjson
+    _json_loads = orjson.loads
+except Exception:
+    _json_loads = json.loads
+
+try:
+    # PyAV (bindings da libav) é opcional; permite analisar sem lançar um ffprobe por arquivo
+    import av
+except Exception:
+    av = None
+
+# mesmas flags de spawn do ffmpeg (sem janela de console no Windows, sem herdar descritores)
+from video_processing import _SPAWN_KWARGS
+
+# Resolvido uma vez no import (o launcher já colocou ffmpeg/bin no PATH antes disso);
+# evita que cada subprocess refaça a busca no PATH (caro no Windows por causa do PATHEXT)
+_FFPROBE = shutil.which('ffprobe') or 'ffprobe'
+
+# Somente os campos usados por analyze_file; evita que o ffprobe serialize todo o resto
+_FFPROBE_ENTRIES = (
+    'format=duration,format_name'
+    ':stream=codec_type,codec_name,codec_long_name,width,height,pix_fmt,'
+    'r_frame_rate,avg_frame_rate,sample_rate,channels,bits_per_raw_sample'
+)
+
+# Cache em disco das decisões de recommend_concat_method, chaveado pelo conteúdo dos arquivos
+_DECISION_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'kndauto', 'concat_decisions.json')
+_DECISION_CACHE_MAX = 256
+_CONTENT_HASH_BYTES = 64 * 1024
+_decision_lock = threading.Lock()
 
 
 def _ffprobe_json(path: str) -> Dict[str, Any]:
-    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_streams", "-show_format", path]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    cmd = [_FFPROBE, "-v", "error", "-print_format", "json", "-show_entries", _FFPROBE_ENTRIES, path]
+    # bytes direto do pipe (sem decodificar para str); json/orjson aceitam bytes. communicate lê
+    # stdout e stderr juntos: ler um até o fim antes do outro trava se o ffprobe encher o pipe do stderr
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_SPAWN_KWARGS) as proc:
+        out, err = proc.communicate()
     if proc.returncode != 0:
-        raise RuntimeError(f"ffprobe falhou para {path}: {proc.stderr.strip()}")
-    return json.loads(proc.stdout)
+        raise RuntimeError(f"ffprobe falhou para {path}: {err.decode('utf-8', 'replace').strip()}")
+    return _json_loads(out)
+
+
+def _pyav_json(path: str) -> Dict[str, Any]:
+    """Abre o arquivo com PyAV e devolve um dict no mesmo formato da saída do ffprobe."""
+    with av.open(path) as container:
+        fmt = {
+            'format_name': container.format.name,
+            'duration': container.duration / av.time_base if container.duration else None,
+        }
+        streams = []
+        for s in container.streams:
+            ctx = s.codec_context
+            if s.type == 'video':
+                rate = s.average_rate or s.guessed_rate
+                streams.append({
+                    'codec_type': 'video',
+                    'codec_name': ctx.name,
+                    'codec_long_name': ctx.codec.long_name,
+                    'width': ctx.width,
+                    'height': ctx.height,
+                    'pix_fmt': ctx.pix_fmt,
+                    'r_frame_rate': f'{rate.numerator}/{rate.denominator}' if rate else '',
+                })
+            elif s.type == 'audio':
+                layout = getattr(ctx, 'layout', None)
+                streams.append({
+                    'codec_type': 'audio',
+                    'codec_name': ctx.name,
+                    'sample_rate': ctx.sample_rate,
+                    'channels': layout.nb_channels if layout is not None else getattr(ctx, 'channels', 0),
+                })
+    return {'format': fmt, 'streams': streams}
+
+
+def _probe_json(path: str) -> Dict[str, Any]:
+    # preferir PyAV (in-process); se não estiver instalado ou falhar, usar ffprobe
+    if av is not None:
+        try:
+            return _pyav_json(path)
+        except Exception:
+            pass
+    return _ffprobe_json(path)
+
+
+@lru_cache(maxsize=1024)
+def _probe_json_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    # mtime_ns/size fazem parte da chave: se o arquivo mudar, o cache é invalidado
+    return _probe_json(path)
 
 
 def _parse_r_frame_rate(r: str) -> float:
@@ -47,7 +141,12 @@ def _parse_r_frame_rate(r: str) -> float:
 
 
 def analyze_file(path: str) -> Dict[str, Any]:
-    data = _ffprobe_json(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        data = _probe_json(path)
+    else:
+        data = _probe_json_cached(os.path.abspath(path), st.st_mtime_ns, st.st_size)
     streams = data.get('streams', [])
     info = {
         'path': path,
@@ -78,11 +177,29 @@ def analyze_file(path: str) -> Dict[str, Any]:
     return info
 
 
+def analyze_files(paths: List[str]) -> List[Dict[str, Any]]:
+    """Analisa vários arquivos em paralelo (um ffprobe por thread), preservando a ordem."""
+    if len(paths) <= 1:
+        return [analyze_file(p) for p in paths]
+    # esperar o ffprobe (Popen.communicate) libera o GIL, então threads bastam
+    workers = min(len(paths), os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze_file, paths))
+
+
 def _float_close(a: float, b: float, tol: float = 0.01) -> bool:
     return abs(a - b) <= tol
 
 
-def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
+def _video_key(v: Dict[str, Any]) -> tuple:
+    return (v['codec_name'], v['width'], v['height'], round(v.get('fps') or 0.0, 2), v.get('pix_fmt'))
+
+
+def _audio_key(a: Dict[str, Any]) -> tuple:
+    return (a['codec_name'], a['sample_rate'], a['channels'])
+
+
+def can_concat_without_reencode(paths: List[str], infos: Optional[List[Dict[str, Any]]] = None) -> Tuple[bool, List[str]]:
     """Verifica se todos os arquivos possuem propriedades compatíveis para concat demuxer (sem re-encode).
 
     Critérios (simplificados):
@@ -92,9 +209,12 @@ def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
     - fps igual (com tolerância)
     - mesma pixel format idealmente
 
+    Se `infos` (resultado de analyze_files(paths)) for passado, os arquivos não são analisados de novo.
+
     Retorna (True, []) se pode concatenar; caso contrário, (False, [reasons...])
     """
-    infos = [analyze_file(p) for p in paths]
+    if infos is None:
+        infos = analyze_files(paths)
     reasons: List[str] = []
 
     # verificar vídeo
@@ -104,7 +224,9 @@ def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
         return False, reasons
 
     first = videos[0]
-    for idx, v in enumerate(videos[1:], start=2):
+    # caminho rápido: se todas as chaves forem iguais não há diferença a reportar
+    same_video = len({_video_key(v) for v in videos}) == 1
+    for idx, v in enumerate([] if same_video else videos[1:], start=2):
         if v['codec_name'] != first['codec_name']:
             reasons.append(f"Codec de vídeo diferente entre 1 e {idx}: {first['codec_name']} != {v['codec_name']}")
         if v['width'] != first['width'] or v['height'] != first['height']:
@@ -122,7 +244,7 @@ def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
         reasons.append('Alguns arquivos têm stream de áudio e outros não')
     else:
         # se ambos tem audio, comparar codec/sample/channels
-        if audios[0] is not None:
+        if audios[0] is not None and len({_audio_key(a) for a in audios}) > 1:
             first_a = audios[0]
             for idx, a in enumerate(audios[1:], start=2):
                 if a['codec_name'] != first_a['codec_name']:
@@ -136,16 +258,85 @@ def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
     return can, reasons
 
 
-def recommend_concat_method(paths: List[str]) -> Tuple[str, List[str]]:
-    can, reasons = can_concat_without_reencode(paths)
+def _content_key(path: str) -> str:
+    """Hash dos primeiros 64 KiB + tamanho: identifica o mesmo conteúdo entre execuções."""
+    with open(path, 'rb') as f:
+        head = f.read(_CONTENT_HASH_BYTES)
+    return f'{hashlib.blake2b(head, digest_size=16).hexdigest()}:{os.path.getsize(path)}'
+
+
+def _load_decisions() -> Dict[str, Any]:
+    try:
+        with open(_DECISION_CACHE_PATH, 'rb') as f:
+            return _json_loads(f.read())
+    except Exception:
+        return {}
+
+
+def _save_decision(key: str, method: str, reasons: List[str]) -> None:
+    with _decision_lock:
+        decisions = _load_decisions()
+        decisions.pop(key, None)
+        decisions[key] = [method, reasons]
+        # manter só as entradas mais recentes (dict preserva a ordem de inserção)
+        while len(decisions) > _DECISION_CACHE_MAX:
+            decisions.pop(next(iter(decisions)))
+        # arquivo temporário próprio de cada escrita: processos do pool do web_app gravam ao
+        # mesmo tempo e um nome .tmp fixo faria um truncar o arquivo do outro
+        cache_dir = os.path.dirname(_DECISION_CACHE_PATH)
+        tmp = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='concat_decisions_', suffix='.tmp')
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(decisions, f, ensure_ascii=False)
+            os.replace(tmp, _DECISION_CACHE_PATH)
+        except Exception as e:
+            print('analyze_codecs: não foi possível gravar o cache de decisões:', e)
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+def _decision_key(paths: List[str]) -> Optional[str]:
+    try:
+        return '|'.join(_content_key(p) for p in paths)
+    except OSError:
+        return None
+
+
+def _cached_decision(key: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+    cached = _load_decisions().get(key) if key is not None else None
+    return (cached[0], list(cached[1])) if cached else None
+
+
+def cached_concat_decision(paths: List[str]) -> Optional[Tuple[str, List[str]]]:
+    """Retorna a decisão (method, reasons) já calculada para esse conteúdo, ou None."""
+    return _cached_decision(_decision_key(paths))
+
+
+def recommend_concat_method(paths: List[str], infos: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, List[str]]:
+    # decisão em cache (em disco) para o mesmo conteúdo, na mesma ordem: evita analisar de novo
+    # quando o pipeline é reexecutado com as mesmas URLs
+    key = _decision_key(paths)
+    cached = _cached_decision(key)
+    if cached is not None:
+        return cached
+
+    can, reasons = can_concat_without_reencode(paths, infos=infos)
     if can:
-        return 'concat', ['Arquivos compatíveis — usar concat demuxer (sem re-encode)']
-    # caso contrário, sugerir re-encode para H.264/AAC com parâmetros seguros
-    rec = [
-        'Recomendado re-encodar: parâmetros alvo H.264 (libx264) para vídeo e AAC para áudio',
-        'Razões: ' + '; '.join(reasons)
-    ]
-    return 'reencode', rec
+        method, rec = 'concat', ['Arquivos compatíveis — usar concat demuxer (sem re-encode)']
+    else:
+        # caso contrário, sugerir re-encode para H.264/AAC com parâmetros seguros
+        method, rec = 'reencode', [
+            'Recomendado re-encodar: parâmetros alvo H.264 (libx264) para vídeo e AAC para áudio',
+            'Razões: ' + '; '.join(reasons)
+        ]
+    if key is not None:
+        _save_decision(key, method, rec)
+    return method, rec
 
 
 if __name__ == '__main__':
@@ -157,7 +348,7 @@ if __name__ == '__main__':
     for p in paths:
         print(' -', p)
     try:
-        results = [analyze_file(p) for p in paths]
+        results = analyze_files(paths)
         for r in results:
             print('\nArquivo:', r['path'])
             print('  formato:', r.get('format_name'))
@@ -174,7 +365,7 @@ if __name__ == '__main__':
                 print('  sample_rate:', a.get('sample_rate'))
                 print('  canais:', a.get('channels'))
 
-        method, reasons = recommend_concat_method(paths)
+        method, reasons = recommend_concat_method(paths, infos=results)
         print('\nRecomendação:', method)
         for line in reasons:
             print(' -', line)
@@ -5,8 +5,8 @@ Concatena dois ou mais vídeos em um único MP4.
 
 Estratégia:
 - Tenta concatenação sem re-encodificação usando o concat demuxer do ffmpeg
-- Se não for possível (incompatibilidade de codecs/resolução/fps), re-encoda cada
-  arquivo para um MPEG-TS com H.264/AAC e concatena os .ts (fallback seguro)
+- Se não for possível (incompatibilidade de codecs/resolução/fps), re-encoda e concatena
+  tudo numa única chamada ao ffmpeg com o filtro concat (H.264/AAC, fallback seguro)
 
 Uso (CLI):
     python src/concat_videos.py out.mp4 input1.mp4 input2.mp4 [...]
@@ -15,41 +15,98 @@ O script usa `analyze_codecs.can_concat_without_reencode` para decidir automatic
 """
 
 import os
+import shutil
 import subprocess
 import tempfile
-from typing import List, Tuple
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     # importar função de análise (o arquivo analyze_codecs.py foi criado anteriormente)
-    from analyze_codecs import can_concat_without_reencode, recommend_concat_method
+    from analyze_codecs import analyze_files, cached_concat_decision, can_concat_without_reencode, recommend_concat_method
 except Exception:
     # caso a importação falhe (contexto), definir stubs conservadores
-    def can_concat_without_reencode(paths: List[str]) -> Tuple[bool, List[str]]:
+    def cached_concat_decision(paths: List[str]):
+        return None
+    def analyze_files(paths: List[str]):
+        return [{'video': None, 'audio': {}, 'duration': 0.0} for _ in paths]
+    def can_concat_without_reencode(paths: List[str], infos=None) -> Tuple[bool, List[str]]:
         return False, ['analyze_codecs não disponível']
-    def recommend_concat_method(paths: List[str]):
+    def recommend_concat_method(paths: List[str], infos=None):
         return 'reencode', ['analyze_codecs não disponível']
 
+# mesma escolha de encoder (e mesma qualidade por crf) e mesmas flags de spawn usadas no split
+from video_processing import _SPAWN_KWARGS, encoder_args, pick_encoder
 
-def _run(cmd: List[str]):
+# Resolvido uma vez no import (o launcher já colocou ffmpeg/bin no PATH antes disso);
+# evita que cada subprocess refaça a busca no PATH (caro no Windows por causa do PATHEXT)
+_FFMPEG = shutil.which('ffmpeg') or 'ffmpeg'
+
+
+def _run(cmd: List[str], total_seconds: Optional[float] = None, stderr_tail: int = 50):
+    """Executa um comando do ffmpeg consumindo stdout/stderr em streaming.
+
+    Se o comando usar `-progress pipe:1`, o stdout traz linhas key=value; com `total_seconds`
+    informado imprime o progresso a cada 10%. O stderr é drenado numa thread separada e só
+    as últimas `stderr_tail` linhas são guardadas para a mensagem de erro (memória O(1) e sem
+    deadlock de pipe cheio no Windows).
+    """
     print('>',' '.join(cmd))
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    tail = deque(maxlen=stderr_tail)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            encoding='utf-8', errors='replace', **_SPAWN_KWARGS)
+
+    def _drain_stderr():
+        for line in proc.stderr:
+            tail.append(line.rstrip())
+
+    t = threading.Thread(target=_drain_stderr, daemon=True)
+    t.start()
+    last_step = 0
+    for line in proc.stdout:
+        if total_seconds and line.startswith('out_time_us='):
+            try:
+                done = int(line.split('=', 1)[1]) / 1_000_000
+            except ValueError:
+                continue
+            step = min(10, int(done / total_seconds * 10))
+            if step > last_step:
+                last_step = step
+                print(f'   progresso: {step * 10}%')
+    proc.wait()
+    t.join()
     if proc.returncode != 0:
-        raise RuntimeError(f"Comando falhou: {' '.join(cmd)}\nSTDOUT:\n{proc.stdout}\nSTDERR:\n{proc.stderr}")
+        stderr = '\n'.join(tail)
+        raise RuntimeError(f"Comando falhou: {' '.join(cmd)}\nSTDERR:\n{stderr}")
     return proc
 
 
+def _escape_concat_path(p: str) -> str:
+    """Escapa um caminho para uso entre aspas simples no listfile do concat demuxer.
+
+    Dentro de '...' o ffmpeg trata tudo literalmente (inclusive barras invertidas do Windows);
+    só a aspa simples precisa sair da string, virar \\' e reabrir: '\\''
+    """
+    return p.replace("'", r"'\''")
+
+
+def _write_concat_list(paths: List[str]) -> str:
+    """Escreve o listfile do concat demuxer num arquivo temporário e retorna seu caminho."""
+    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.txt', encoding='utf-8', newline='\n') as f:
+        for p in paths:
+            f.write(f"file '{_escape_concat_path(os.path.abspath(p))}'\n")
+        return f.name
+
+
 def concat_without_reencode(paths: List[str], output: str):
     """Concat usando concat demuxer (-f concat -i list.txt -c copy).
 
     Requer que todos os arquivos tenham codecs/resolução/fps compatíveis.
     """
-    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.txt', encoding='utf-8') as f:
-        for p in paths:
-            # ffmpeg espera caminhos com quotes se tiverem espaços
-            f.write(f"file '{os.path.abspath(p).replace("'", "'\\''")}" + "'\n")
-        list_path = f.name
+    list_path = _write_concat_list(paths)
     try:
-        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output]
+        cmd = [_FFMPEG, '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output]
         _run(cmd)
     finally:
         try:
@@ -58,49 +115,121 @@ def concat_without_reencode(paths: List[str], output: str):
             pass
 
 
-def concat_with_reencode(paths: List[str], output: str, crf: int = 20, preset: str = 'veryfast'):
-    """Re-encoda cada entrada para MPEG-TS com H.264/AAC e concatena os .ts resultantes.
+# decodificação em hardware para acompanhar o encoder. Sem -hwaccel_output_format os quadros voltam
+# para a memória do sistema, porque o scale/pad/fps do filtro concat roda na CPU
+_HWACCEL_ARGS = {'h264_nvenc': ['-hwaccel', 'cuda']}
+
+
+def _video_encoder_args(crf: int, preset: str, hw_encoder: bool = True) -> List[str]:
+    """Argumentos -c:v para o encoder escolhido (hardware quando disponível, senão libx264).
+
+    A detecção e o mapeamento de qualidade são os mesmos do split (video_processing).
+    """
+    return encoder_args(pick_encoder() if hw_encoder else 'libx264', crf, preset)
+
+
+def _probe_inputs(paths: List[str], infos: Optional[List[Dict[str, Any]]] = None):
+    """Retorna (largura, altura, fps, [tem_audio...], [duracao...]) usados para montar o filtro de concat."""
+    if infos is None:
+        infos = analyze_files(paths)
+    first_v = next((i['video'] for i in infos if i.get('video')), None) or {}
+    width = first_v.get('width') or 1280
+    height = first_v.get('height') or 720
+    fps = first_v.get('fps') or 30
+    has_audio = [i.get('audio') is not None for i in infos]
+    durations = [i.get('duration') or 0.0 for i in infos]
+    return width, height, fps, has_audio, durations
+
+
+def concat_with_reencode(paths: List[str], output: str, crf: int = 20, preset: str = 'veryfast',
+                         infos: Optional[List[Dict[str, Any]]] = None, hw_encoder: bool = True):
+    """Re-encoda e concatena todas as entradas numa única chamada ao ffmpeg (filtro concat).
 
     Fluxo:
-    - para cada input: ffmpeg -i in -c:v libx264 -preset <preset> -crf <crf> -pix_fmt yuv420p -c:a aac -b:a 128k -f mpegts tmpN.ts
-    - depois: ffmpeg -y -i "concat:tmp1.ts|tmp2.ts|..." -c copy -bsf:a aac_adtstoasc output
+    - ffmpeg -i in1 -i in2 ... -filter_complex "<normaliza cada entrada>;[v0][a0][v1][a1]...concat=n=N:v=1:a=1[v][a]"
+      -map [v] -map [a] -c:v libx264 -preset <preset> -crf <crf> -pix_fmt yuv420p -c:a aac -b:a 128k output
+
+    Com hw_encoder=True usa um encoder H.264 de hardware (NVENC/QSV/VideoToolbox/AMF) se houver
+    um utilizável, com fallback para libx264 se ele falhar. Com NVENC as entradas também são
+    decodificadas na GPU (-hwaccel cuda).
+
+    Cada vídeo é escalado/centralizado para a resolução e fps da primeira entrada (o filtro
+    concat exige parâmetros iguais). Entradas sem áudio recebem silêncio (anullsrc) se alguma
+    outra tiver áudio. Não há arquivos intermediários nem um processo por entrada.
     """
-    tmp_files = []
+    width, height, fps, has_audio, durations = _probe_inputs(paths, infos)
+    with_audio = any(has_audio)
+
+    # progresso em key=value no stdout em vez das estatísticas por frame no stderr
+    head = [_FFMPEG, '-y', '-nostats', '-loglevel', 'error', '-progress', 'pipe:1']
+    n = len(paths)
+    silence = []
+    filters = []
+    labels = []
+    for i, p in enumerate(paths):
+        filters.append(
+            f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p[v{i}]"
+        )
+        labels.append(f'[v{i}]')
+        if with_audio:
+            if has_audio[i]:
+                src = f'[{i}:a]'
+            else:
+                # entrada extra de silêncio com a mesma duração do vídeo
+                silence += ['-f', 'lavfi', '-t', str(durations[i]), '-i', 'anullsrc=r=48000:cl=stereo']
+                src = f'[{n}:a]'
+                n += 1
+            filters.append(f"{src}aresample=48000,aformat=channel_layouts=stereo[a{i}]")
+            labels.append(f'[a{i}]')
+    filters.append(f"{''.join(labels)}concat=n={len(paths)}:v=1:a={1 if with_audio else 0}[v]" + ('[a]' if with_audio else ''))
+
+    tail = ['-filter_complex', ';'.join(filters), '-map', '[v]']
+    if with_audio:
+        tail += ['-map', '[a]']
+    audio_args = ['-c:a', 'aac', '-b:a', '128k'] if with_audio else []
+
+    def build(video_args: List[str]) -> List[str]:
+        # com NVENC a decodificação também vai para a GPU (-hwaccel antes de cada arquivo de entrada)
+        decode = _HWACCEL_ARGS.get(video_args[1], [])
+        inputs = [a for p in paths for a in (*decode, '-i', p)]
+        return head + inputs + silence + tail + video_args + ['-pix_fmt', 'yuv420p'] + audio_args + [output]
+
+    video_args = _video_encoder_args(crf, preset, hw_encoder)
     try:
-        for i, p in enumerate(paths, start=1):
-            tmp = os.path.join(tempfile.gettempdir(), f'kndconcat_{os.getpid()}_{i}.ts')
-            cmd = [
-                'ffmpeg', '-y', '-i', p,
-                '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
-                '-c:a', 'aac', '-b:a', '128k', '-f', 'mpegts', tmp
-            ]
-            _run(cmd)
-            tmp_files.append(tmp)
-
-        concat_input = 'concat:' + '|'.join(tmp_files)
-        cmd2 = ['ffmpeg', '-y', '-i', concat_input, '-c', 'copy', '-bsf:a', 'aac_adtstoasc', output]
-        _run(cmd2)
-    finally:
-        for t in tmp_files:
-            try:
-                os.remove(t)
-            except Exception:
-                pass
+        _run(build(video_args), total_seconds=sum(durations))
+    except RuntimeError as e:
+        if video_args[1] == 'libx264':
+            raise
+        # encoder de hardware falhou (driver, limite de sessões, resolução...): refazer em software
+        print('Encoder de hardware falhou, refazendo com libx264:', e)
+        video_args = _video_encoder_args(crf, preset, hw_encoder=False)
+        _run(build(video_args), total_seconds=sum(durations))
 
 
-def concat_videos(paths: List[str], output: str, force_reencode: bool = False) -> str:
+def concat_videos(paths: List[str], output: str, force_reencode: bool = False,
+                  infos: Optional[List[Dict[str, Any]]] = None) -> str:
     """Concatena videos. Retorna o caminho do arquivo final (output).
 
-    Se force_reencode=True, pula análise e usa re-encode.
+    Se force_reencode=True, pula a recomendação e usa re-encode.
+    Os arquivos são analisados uma única vez; quem já tem o resultado de
+    analyze_files(paths) pode passá-lo em `infos` para evitar nova análise.
     """
     if not paths or len(paths) < 2:
         raise ValueError('É necessário pelo menos 2 arquivos de entrada para concatenar')
 
+    # mesmo conteúdo já analisado (nesta ou numa execução anterior)?
+    cached = None if force_reencode or infos is not None else cached_concat_decision(paths)
     if force_reencode:
         method = 'reencode'
         reasons = ['Usuário forçou re-encode']
+    elif cached is not None:
+        method, reasons = cached
     else:
-        method, reasons = recommend_concat_method(paths)
+        # explicar o motivo com a análise por arquivo
+        if infos is None:
+            infos = analyze_files(paths)
+        method, reasons = recommend_concat_method(paths, infos=infos)
 
     print('Método escolhido:', method)
     for r in reasons:
@@ -114,7 +243,7 @@ def concat_videos(paths: List[str], output: str, force_reencode: bool = False) -
             print('Concat sem re-encode falhou, faremos fallback para re-encode:', e)
 
     # fallback para re-encode
-    concat_with_reencode(paths, output)
+    concat_with_reencode(paths, output, infos=infos)
     return output
 
 
@@ -4,14 +4,17 @@ download_videos.py
 Funções para baixar vídeos de tweets/X usando yt-dlp.
 
 Uso:
-    from download_videos import download_tweet_video, download_two_videos
+    from download_videos import download_tweet_video, download_two_videos, download_videos
 
     path1 = download_tweet_video(url1, out_dir="./downloads")
     path2 = download_tweet_video(url2, out_dir="./downloads")
 
-    # ou baixar dois de uma vez
+    # ou baixar dois de uma vez (em paralelo)
     p1, p2 = download_two_videos(url1, url2, out_dir="./downloads")
 
+    # ou N vídeos em paralelo
+    paths = download_videos([url1, url2, url3], out_dir="./downloads")
+
 Observações:
 - Requer `yt-dlp` instalado (pip install yt-dlp) e acesso de rede.
 - Para tweets privados, passe um arquivo de cookies em formato Netscape (cookies.txt) via
@@ -21,29 +24,47 @@ Observações:
 import os
 import re
 import time
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
-try:
-    # Import do módulo Python do yt-dlp (recomendado para uso programático)
-    import yt_dlp as ytdlp
-except Exception as e:
-    ytdlp = None
-    # Não falhar aqui; o script irá avisar ao usuário para instalar.
+def _get_ytdlp():
+    """Importa o yt-dlp sob demanda (o import é pesado); retorna None se não estiver instalado."""
+    try:
+        # Import do módulo Python do yt-dlp (recomendado para uso programático)
+        import yt_dlp as ytdlp
+    except Exception:
+        # Não falhar aqui; o chamador irá avisar ao usuário para instalar.
+        return None
+    return ytdlp
 
-TWEET_RE = re.compile(
-    r'^https?://(?:www\.)?(?:x\.com|twitter\.com)/[^/]+/(?:status|statuses)/(?P<id>\d+)', re.IGNORECASE
-)
+# casado contra a URL já em minúsculas, então sem re.IGNORECASE (evita o case folding do regex)
+TWEET_RE = re.compile(r'^https?://(?:www\.)?(?:x\.com|twitter\.com)/[^/]+/status(?:es)?/(?P<id>\d+)')
+# método ligado resolvido uma vez; evita o lookup de atributo a cada URL
+_TWEET_MATCH = TWEET_RE.match
 
 
 def extract_tweet_id(url: str) -> Optional[str]:
-    m = TWEET_RE.match(url.strip())
-    return m.group('id') if m else None
+    u = url.strip().lower()
+    # atalho: URL que nem menciona x.com/twitter.com não passa pelo regex
+    if 'x.com' not in u and 'twitter.com' not in u:
+        return None
+    m = _TWEET_MATCH(u)
+    return m[1] if m else None
 
 
 def _ensure_out_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
+def _find_downloaded(out_dir: str, prefix: str) -> Optional[str]:
+    """Retorna o primeiro arquivo de out_dir cujo nome começa com prefix (ou None)."""
+    with os.scandir(out_dir) as it:
+        for entry in it:
+            if entry.name.startswith(prefix):
+                return os.path.join(out_dir, entry.name)
+    return None
+
+
 def download_tweet_video(url: str, out_dir: str = './downloads', cookies_file: Optional[str] = None, max_retries: int = 3, timeout: int = 300) -> str:
     """
     Baixa o vídeo principal do tweet usando yt-dlp.
@@ -57,6 +78,7 @@ def download_tweet_video(url: str, out_dir: str = './downloads', cookies_file: O
     - max_retries: número de tentativas em caso de falha
     - timeout: timeout (segundos) para a operação de download (passada ao yt-dlp como --socket-timeout)
     """
+    ytdlp = _get_ytdlp()
     if ytdlp is None:
         raise RuntimeError('yt-dlp não está instalado como módulo Python. Rode: python -m pip install yt-dlp')
 
@@ -90,19 +112,16 @@ def download_tweet_video(url: str, out_dir: str = './downloads', cookies_file: O
                 # O yt-dlp retornará um dict com 'ext' e 'requested_downloads' info.
                 # Precisamos localizar o arquivo salvo: a saída tem pattern outtmpl com ext.
                 ext = info.get('ext') or info.get('requested_formats', [{}])[-1].get('ext')
+                if ext:
+                    out_path = os.path.join(out_dir, f"{tid}.{ext}")
+                    if os.path.exists(out_path):
+                        return out_path
+                # sem extensão conhecida, ou o yt-dlp salvou com outro nome: procurar por prefixo id
+                found = _find_downloaded(out_dir, tid + '.')
+                if found:
+                    return found
                 if not ext:
-                    # fallback: procurar nos arquivos da pasta por prefixo id
-                    for f in os.listdir(out_dir):
-                        if f.startswith(tid + '.'):
-                            return os.path.join(out_dir, f)
                     raise RuntimeError('Não foi possível determinar a extensão do arquivo baixado')
-                out_path = os.path.join(out_dir, f"{tid}.{ext}")
-                if os.path.exists(out_path):
-                    return out_path
-                # se não existe, talvez o yt-dlp salvou com outro nome; tentar localizar
-                for f in os.listdir(out_dir):
-                    if f.startswith(tid + '.'):
-                        return os.path.join(out_dir, f)
                 raise RuntimeError('Download aparentemente concluído mas arquivo não encontrado')
         except Exception as e:
             last_exc = e
@@ -113,10 +132,19 @@ def download_tweet_video(url: str, out_dir: str = './downloads', cookies_file: O
     raise RuntimeError(f'Falha ao baixar {url} após {max_retries} tentativas: {last_exc}')
 
 
+def download_videos(urls: List[str], out_dir: str = './downloads', cookies_file: Optional[str] = None,
+                    max_workers: int = 4) -> List[str]:
+    """Baixa vários vídeos em paralelo (até `max_workers` de uma vez) e retorna os caminhos na mesma ordem das URLs."""
+    if not urls:
+        return []
+    # downloads são limitados por rede, então threads são suficientes
+    with ThreadPoolExecutor(max_workers=min(len(urls), max_workers)) as ex:
+        return list(ex.map(lambda u: download_tweet_video(u, out_dir=out_dir, cookies_file=cookies_file), urls))
+
+
 def download_two_videos(url1: str, url2: str, out_dir: str = './downloads', cookies_file: Optional[str] = None) -> Tuple[str, str]:
-    """Baixa os dois vídeos e retorna os dois caminhos (path1, path2)."""
-    p1 = download_tweet_video(url1, out_dir=out_dir, cookies_file=cookies_file)
-    p2 = download_tweet_video(url2, out_dir=out_dir, cookies_file=cookies_file)
+    """Baixa os dois vídeos em paralelo e retorna os dois caminhos (path1, path2)."""
+    p1, p2 = download_videos([url1, url2], out_dir=out_dir, cookies_file=cookies_file)
     return p1, p2
 
 
@@ -7,8 +7,8 @@ no endereço local. Projetado para ser empacotado com PyInstaller em um único .
 Comportamento:
 - Se houver uma pasta "ffmpeg" ao lado do executável (ou no projeto durante desenvolvimento),
   adiciona seu subdiretório "bin" ao PATH para que ffmpeg/ffprobe sejam encontrados.
-- Inicia uvicorn numa thread em background e aguarda a porta ficar disponível antes de
-  abrir o navegador padrão em http://127.0.0.1:8000/
+- Inicia uvicorn numa thread em background e aguarda o servidor sinalizar que subiu
+  (uvicorn.Server.started) antes de abrir o navegador padrão em http://127.0.0.1:8000/
 
 Uso para empacotar:
   1) Coloque a pasta "ffmpeg" (contendo bin\ffmpeg.exe e bin\ffprobe.exe) na raiz do projeto.
@@ -25,8 +25,8 @@ import sys
 import threading
 import time
 import webbrowser
-import socket
 import logging
+import multiprocessing
 
 # Configure simple file logging so the launcher writes diagnostics when run as an exe
 log_path = os.path.join(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(__file__), 'launcher.log')
@@ -50,36 +50,46 @@ def ensure_ffmpeg_in_path():
         logger.info('ffmpeg bin not found at: %s', ff_bin)
 
 
-def run_server():
+def start_server(host='127.0.0.1', port=8000):
+    """Cria o uvicorn.Server e o inicia numa thread em background. Retorna (server, thread)."""
     # Importar localmente para reduzir custo na inicialização
     import uvicorn
     from web_app import app
-    # uvicorn.run bloqueia; rodamos em uma thread separada
-    logger.info('Starting uvicorn server...')
-    try:
-        uvicorn.run(app, host='127.0.0.1', port=8000)
-    except Exception as e:
-        logger.exception('uvicorn.run failed: %s', e)
-
+    config = uvicorn.Config(app, host=host, port=port)
+    server = uvicorn.Server(config)
 
-def wait_for_port(host='127.0.0.1', port=8000, timeout=30.0):
-    start = time.time()
-    while time.time() - start < timeout:
+    def _serve():
+        logger.info('Starting uvicorn server...')
         try:
-            with socket.create_connection((host, port), timeout=1):
-                return True
-        except Exception:
-            time.sleep(0.2)
-    return False
+            server.run()
+        except Exception as e:
+            logger.exception('uvicorn server failed: %s', e)
+
+    # server.run bloqueia; rodamos em uma thread separada
+    t = threading.Thread(target=_serve, daemon=True)
+    t.start()
+    return server, t
+
+
+def wait_for_server(server, thread, timeout=30.0):
+    """Aguarda o uvicorn sinalizar `server.started` (sem conectar na porta)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.started:
+            return True
+        if not thread.is_alive():
+            # a thread morreu antes de subir (ex.: porta em uso)
+            return False
+        time.sleep(0.01)
+    return server.started
 
 
 def main():
     ensure_ffmpeg_in_path()
     logger.info('Launcher started')
-    t = threading.Thread(target=run_server, daemon=True)
-    t.start()
+    server, t = start_server('127.0.0.1', 8000)
 
-    ready = wait_for_port('127.0.0.1', 8000, timeout=30.0)
+    ready = wait_for_server(server, t, timeout=30.0)
     url = 'http://127.0.0.1:8000/'
     if ready:
         try:
@@ -101,4 +111,7 @@ def main():
 
 
 if __name__ == '__main__':
+    # no .exe (PyInstaller) os processos do pool do web_app são iniciados com spawn e reexecutam o
+    # executável: freeze_support faz esses filhos rodarem só o worker, não outro main()
+    multiprocessing.freeze_support()
     main()
@@ -14,6 +14,8 @@ Opções: --cookies, --force-reencode
 """
 
 import os
+import re
+import secrets
 import sys
 import argparse
 import time
@@ -22,52 +24,86 @@ def _ensure_out_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|]')
+_WHITESPACE = re.compile(r'\s+')
+
+
 def safe_filename(s: str) -> str:
-    import re
-    s = (s or '').strip()
-    s = re.sub(r'[\\/:*?"<>|]', '', s)
-    s = re.sub(r'\s+', '_', s)
-    return s or 'video'
+    return _WHITESPACE.sub('_', _UNSAFE_CHARS.sub('', (s or '').strip())) or 'video'
 
 
 def unique_path(directory: str, base: str, ext: str) -> str:
     os.makedirs(directory, exist_ok=True)
     candidate = os.path.join(directory, f"{base}{ext}")
-    i = 1
-    while os.path.exists(candidate):
-        candidate = os.path.join(directory, f"{base}_{i}{ext}")
-        i += 1
+    if not os.path.exists(candidate):
+        return candidate
+    # nome ocupado: sufixo com timestamp em ms (uma verificação só, em vez de testar _1, _2, ...)
+    candidate = os.path.join(directory, f"{base}_{int(time.time() * 1000)}{ext}")
+    if os.path.exists(candidate):
+        candidate = os.path.join(directory, f"{base}_{secrets.token_hex(4)}{ext}")
     return candidate
 
 
-def run_pipeline(url1: str, url2: str, out_dir: str, output: str = None, title: str = '', cookies: str = None, force_reencode: bool = False):
-    # importar dinamicamente os módulos do diretório src (quando executado como python src/run_pipeline.py)
+def _import_step(name: str):
+    import importlib
     try:
-        import validate_environment as validator
-        import download_videos as downloader
-        import analyze_codecs as analyzer
-        import concat_videos as concater
+        return importlib.import_module(name)
     except Exception as e:
         raise RuntimeError(f'Erro ao importar módulos do src: {e}')
 
-    print('1) Validando URLs e ambiente...')
+
+# etapas usadas pelo merge_files (rodam nos processos do EXECUTOR do web_app)
+MERGE_STEPS = ('analyze_codecs', 'concat_videos')
+
+
+def preload_steps(modules=MERGE_STEPS) -> None:
+    """Importa os módulos das etapas de uma vez (initializer do pool de processos e startup do web_app).
+
+    Uma falha aqui não derruba nada: a etapa reporta o erro quando rodar.
+    """
+    for name in modules:
+        try:
+            _import_step(name)
+        except RuntimeError as e:
+            print(f'Não foi possível pré-carregar {name}: {e}')
+
+
+def validate_inputs(url1: str, url2: str) -> None:
+    """Etapa 1: valida as URLs e as ferramentas; levanta RuntimeError se algo falhar."""
+    validator = _import_step('validate_environment')
     ok, info = validator.validate(url1, url2)
     if not ok:
         raise RuntimeError('Validação falhou: verifique URLs e ferramentas (yt-dlp, ffmpeg)')
 
+
+def _pipeline_dirs(out_dir: str) -> tuple[str, str]:
     # Prepare structured directories: downloads/twitter/raw_videos and downloads/twitter/output_videos
     base_out = os.path.abspath(out_dir)
     raw_dir = os.path.join(base_out, 'twitter', 'raw_videos')
     output_dir = os.path.join(base_out, 'twitter', 'output_videos')
     _ensure_out_dir(raw_dir)
     _ensure_out_dir(output_dir)
+    return raw_dir, output_dir
 
-    print('2) Baixando vídeos com yt-dlp...')
-    p1, p2 = downloader.download_two_videos(url1, url2, out_dir=raw_dir, cookies_file=cookies)
-    print(' - baixado:', p1)
-    print(' - baixado:', p2)
+
+def download(url: str, out_dir: str, cookies: str = None) -> str:
+    """Etapa 2 para um único vídeo: baixa `url` em <out_dir>/twitter/raw_videos e retorna o caminho.
+
+    Independente do outro vídeo, então quem chama pode baixar os dois em paralelo (ex.: web_app).
+    """
+    raw_dir, _ = _pipeline_dirs(out_dir)
+    downloader = _import_step('download_videos')
+    return downloader.download_tweet_video(url, out_dir=raw_dir, cookies_file=cookies)
+
+
+def merge_files(p1: str, p2: str, out_dir: str, output: str = None, title: str = '', force_reencode: bool = False) -> str:
+    """Etapas 3 e 4: analisa os codecs e concatena p1 + p2. Retorna o caminho do arquivo final."""
+    _, output_dir = _pipeline_dirs(out_dir)
 
     print('3) Analisando codecs e decidindo método de concat...')
+    analyzer = _import_step('analyze_codecs')
+    # a decisão fica em cache (em disco, por conteúdo) e a análise é memoizada por arquivo,
+    # então a etapa de concat reaproveita ambas sem lançar ffprobe de novo
     method, reasons = analyzer.recommend_concat_method([p1, p2])
     print('Recomendação:', method)
     for r in reasons:
@@ -77,6 +113,7 @@ def run_pipeline(url1: str, url2: str, out_dir: str, output: str = None, title:
         print('Forçando re-encode por opção do usuário')
 
     print('4) Concatenando...')
+    concater = _import_step('concat_videos')
     # Decide output filename: if title provided, use it; else use timestamp
     if not output:
         stem = safe_filename(title) if title else f'output_{int(time.time())}'
@@ -89,6 +126,22 @@ def run_pipeline(url1: str, url2: str, out_dir: str, output: str = None, title:
     return out_path
 
 
+def run_pipeline(url1: str, url2: str, out_dir: str, output: str = None, title: str = '', cookies: str = None, force_reencode: bool = False):
+    # importar dinamicamente os módulos do diretório src (quando executado como python src/run_pipeline.py),
+    # cada um só antes da etapa que o usa para não pagar imports pesados (yt-dlp) antecipadamente
+    print('1) Validando URLs e ambiente...')
+    validate_inputs(url1, url2)
+
+    raw_dir, _ = _pipeline_dirs(out_dir)
+    print('2) Baixando vídeos com yt-dlp...')
+    downloader = _import_step('download_videos')
+    p1, p2 = downloader.download_two_videos(url1, url2, out_dir=raw_dir, cookies_file=cookies)
+    print(' - baixado:', p1)
+    print(' - baixado:', p2)
+
+    return merge_files(p1, p2, out_dir, output=output, title=title, force_reencode=force_reencode)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Executa todo o pipeline: validar->baixar->analisar->concat')
     parser.add_argument('url1')
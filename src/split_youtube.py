@@ -7,124 +7,280 @@ This script is cross-platform (requires Python 3.11+, yt-dlp and ffmpeg installe
 """
 from __future__ import annotations
 import argparse
+import hashlib
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import shutil
 import tempfile
+import threading
 import sys
 
 # Ensure the module's directory is on sys.path so local imports (youtube_utils, video_processing)
 # resolve whether the module is imported as a script, as a package, or loaded by spec.
 sys.path.insert(0, str(Path(__file__).parent))
 
-from youtube_utils import download_youtube, get_duration_seconds, split_durations
-from video_processing import extract_segment, convert_to_vertical, add_text
+from youtube_utils import download_many, download_youtube, get_duration_seconds, get_video_size, split_durations
+from video_processing import (convert_and_annotate, convert_and_split, extract_segment_reencode,
+                              probe_keyframes, snap_to_keyframes)
 import re
 
 
+# done-manifest kept in the output dir: which parts of which source were finished with which parameters
+_MANIFEST_NAME = 'done.json'
+# serializes the load+save of done.json between jobs running in this process
+_manifest_lock = threading.Lock()
+_FINGERPRINT_BYTES = 1 << 20
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|]')
+_WHITESPACE = re.compile(r'\s+')
+
+
 def safe_filename(s: str) -> str:
     # remove unsafe chars, replace spaces with underscore
-    s = s.strip()
-    s = re.sub(r'[\\/:*?"<>|]', '', s)
-    s = re.sub(r'\s+', '_', s)
-    return s or 'video'
+    return _WHITESPACE.sub('_', _UNSAFE_CHARS.sub('', s.strip())) or 'video'
 
 
 def unique_path(directory: Path, base: str, ext: str) -> Path:
     directory.mkdir(parents=True, exist_ok=True)
     candidate = directory / f"{base}{ext}"
-    i = 1
-    while candidate.exists():
-        candidate = directory / f"{base}_{i}{ext}"
-        i += 1
+    if not candidate.exists():
+        return candidate
+    # taken: use a millisecond timestamp suffix (one stat instead of probing _1, _2, ...)
+    candidate = directory / f"{base}_{int(time.time() * 1000)}{ext}"
+    if candidate.exists():
+        candidate = directory / f"{base}_{secrets.token_hex(4)}{ext}"
     return candidate
 
 
+def _temp_root(tmp_dir: str | Path | None, src_path: Path) -> str | None:
+    """Directory for the temporary folder: `tmp_dir` if given, else /dev/shm on Linux when it has
+    room for twice the source, else None (system default).
+
+    /dev/shm is RAM: temp segments there cost memory instead of disk IO on the source's disk.
+    """
+    if tmp_dir:
+        Path(tmp_dir).mkdir(parents=True, exist_ok=True)
+        return str(tmp_dir)
+    if sys.platform.startswith('linux') and os.path.isdir('/dev/shm'):
+        try:
+            if shutil.disk_usage('/dev/shm').free > 2 * src_path.stat().st_size:
+                return '/dev/shm'
+        except OSError:
+            pass
+    return None
+
+
+def _existing_files(directory: Path) -> set[str]:
+    """Names of the files in `directory`, from a single scandir."""
+    try:
+        with os.scandir(directory) as it:
+            return {e.name for e in it if e.is_file()}
+    except OSError:
+        return set()
+
+
+def _source_fingerprint(path: Path) -> str:
+    """Cheap fingerprint of a source file: blake2b of its first MiB plus its size."""
+    with open(path, 'rb') as fh:
+        digest = hashlib.blake2b(fh.read(_FINGERPRINT_BYTES), digest_size=16)
+    digest.update(str(path.stat().st_size).encode())
+    return digest.hexdigest()
+
+
+def _load_manifest(output_dir: Path) -> dict:
+    """Load <output_dir>/done.json ({stem: {sha, parts, title, subtitle, ranges, done}}); {} if missing/invalid."""
+    try:
+        with open(output_dir / _MANIFEST_NAME, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest_entry(output_dir: Path, stem: str, entry: dict) -> None:
+    """Update one stem in done.json, writing a temp file and replacing it so a kill never leaves it half written.
+
+    Concurrent jobs (the web app runs several splits into the same folder) share the module lock, so
+    no load+save pair drops another job's entry, and each write has its own temp file.
+    """
+    with _manifest_lock:
+        manifest = _load_manifest(output_dir)
+        manifest[stem] = entry
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=output_dir, prefix=f'{_MANIFEST_NAME}.', suffix='.tmp')
+            with open(fd, 'w', encoding='utf-8') as fh:
+                json.dump(manifest, fh, ensure_ascii=False)
+            os.replace(tmp, output_dir / _MANIFEST_NAME)
+        except OSError as e:
+            print('Não foi possível salvar done.json:', e)
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+def _download_settings(out_dir: str | Path, force_redownload: bool, download_archive: str | None):
+    """Return (raw_dir, skip_if_exists, download_archive) for downloads under <out_dir>/youtube."""
+    base_out = Path(out_dir)
+    raw_dir = base_out / 'youtube' / 'raw_videos'
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    # choose whether to skip download based on force_redownload
+    skip_if_exists = not bool(force_redownload)
+    # default archive file under downloads/youtube/download_archive.txt unless provided
+    if download_archive is None:
+        download_archive = str(base_out / 'youtube' / 'download_archive.txt')
+    return raw_dir, skip_if_exists, download_archive
+
+
+def download_source(url: str, out_dir: str | Path = 'downloads', force_redownload: bool = False,
+                    download_archive: str | None = None, cookies: str | None = None,
+                    cookies_from_browser: str | None = None) -> Path:
+    """Download (or reuse) the source video for `url` into <out_dir>/youtube/raw_videos."""
+    raw_dir, skip_if_exists, download_archive = _download_settings(out_dir, force_redownload, download_archive)
+    return download_youtube(url, raw_dir, skip_if_exists=skip_if_exists, max_height=720,
+                            download_archive=download_archive, cookies=cookies, cookies_from_browser=cookies_from_browser)
+
+
 def run_split(url: str, parts: int = 3, title: str = '', subtitle: str = '', out_dir: str | Path = 'downloads',
               force_reprocess: bool = False, force_redownload: bool = False, download_archive: str | None = None,
-              cookies: str | None = None, cookies_from_browser: str | None = None):
+              cookies: str | None = None, cookies_from_browser: str | None = None, src_path: str | Path | None = None,
+              tmp_dir: str | Path | None = None):
     """Run the split pipeline programmatically.
 
     This function performs the same steps as the CLI: download, split, convert, add texts and export files.
     It is safe to call from other Python modules (e.g. FastAPI background task).
+    If `src_path` is given (already downloaded, e.g. by run_split_many's prefetch) the download step is skipped.
+    `tmp_dir` is where the temporary folder is created (see _temp_root for the default).
     """
     base_out = Path(out_dir)
-    raw_dir = base_out / 'youtube' / 'raw_videos'
     output_dir = base_out / 'youtube' / 'output_videos'
-    raw_dir.mkdir(parents=True, exist_ok=True)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    import time
-    print('1) Baixando vídeo...')
-    t0 = time.monotonic()
-    # choose whether to skip download based on force_redownload
-    skip_if_exists = not bool(force_redownload)
-    # default archive file under downloads/youtube/download_archive.txt unless provided
-    if download_archive is None:
-        download_archive = str(base_out / 'youtube' / 'download_archive.txt')
-    src_path = download_youtube(url, raw_dir, skip_if_exists=skip_if_exists, max_height=720,
-                              download_archive=download_archive, cookies=cookies, cookies_from_browser=cookies_from_browser)
-    t1 = time.monotonic()
-    print(f'Arquivo baixado em {src_path} (download time: {t1-t0:.1f}s)')
+    if src_path is None:
+        print('1) Baixando vídeo...')
+        t0 = time.monotonic()
+        src_path = download_source(url, out_dir, force_redownload=force_redownload, download_archive=download_archive,
+                                   cookies=cookies, cookies_from_browser=cookies_from_browser)
+        t1 = time.monotonic()
+        print(f'Arquivo baixado em {src_path} (download time: {t1-t0:.1f}s)')
+    src_path = Path(src_path)
+
+    # use title (if provided) or source stem to name output files (deterministic name for caching)
+    stem = safe_filename(title) if title else safe_filename(src_path.stem)
+    params = {'sha': _source_fingerprint(src_path), 'parts': parts, 'title': title, 'subtitle': subtitle}
+    manifest = _load_manifest(output_dir)
+    entry = manifest.get(stem)
+    if not force_reprocess and entry and all(entry.get(k) == v for k, v in params.items()):
+        done_files = [output_dir / f"{stem}_parte_{idx}.mp4" for idx in range(1, parts + 1)]
+        existing = _existing_files(output_dir)
+        if len(entry.get('done', [])) == parts and all(f.name in existing for f in done_files):
+            print('Todas as partes já foram geradas com os mesmos parâmetros (done.json), nada a fazer:')
+            for f in done_files:
+                print(' -', f)
+            return
+    else:
+        entry = None
 
     print('2) Obtendo duração...')
+    # one ffprobe (probe_all) answers both duration and size; the second call hits its cache
     total = get_duration_seconds(src_path)
     print(f'Duração total: {total:.2f} s')
 
     ranges = split_durations(total, parts)
+    # probe the source size once; segments keep it, so no per-part ffprobe is needed
+    try:
+        source_size = get_video_size(src_path)
+    except Exception as e:
+        print('Não foi possível obter as dimensões do vídeo, cada parte será analisada:', e)
+        source_size = None
 
-    tmpdir = Path(tempfile.mkdtemp(prefix='split_youtube_'))
+    tmpdir = Path(tempfile.mkdtemp(prefix='split_youtube_', dir=_temp_root(tmp_dir, src_path)))
     print('Usando pasta temporária', tmpdir)
 
+    if entry is None or entry.get('ranges') != [list(r) for r in ranges]:
+        entry = {**params, 'ranges': ranges, 'done': []}
+    # where the parts on disk were actually cut: the exact ranges, or the keyframe-snapped
+    # boundaries recorded in 'cuts' when they came from the per-part path
+    cuts = entry.get('cuts', ranges)
+
     produced = []
+    # one directory listing instead of a stat per part (matters on network filesystems); taken
+    # here, after the probes, so it is not stale
+    existing = _existing_files(output_dir)
     try:
-        for idx, (start, duration) in enumerate(ranges, start=1):
-            segment_tmp = tmpdir / f'segment_{idx}.mp4'
-            print(f'Extraindo parte {idx}: start={start} duration={duration}')
-            seg_t0 = time.monotonic()
-            # Try to extract with copy first; if it fails re-encode the segment
-            try:
-                extract_segment(src_path, start, duration, segment_tmp)
-            except Exception as e:
-                print('extract_segment falhou, tentando re-encode para segment_tmp:', e)
-                # re-encode fallback
-                extract_segment_reencode(src_path, start, duration, segment_tmp)
-            # convert to vertical 9:16
-            vertical = tmpdir / f'vertical_{idx}.mp4'
-            print('Convertendo para 9:16...')
-            # convert_to_vertical now returns geometry (scaled_w, scaled_h, overlay_x, overlay_y)
-            v_t0 = time.monotonic()
-            video_geom = convert_to_vertical(segment_tmp, vertical)
-            v_t1 = time.monotonic()
-
-            # add texts if present
-            # use title (if provided) or source stem to name output files (deterministic name for caching)
-            stem = safe_filename(title) if title else safe_filename(src_path.stem)
-            final_base = f"{stem}_parte_{idx}"
-            final_name = output_dir / f"{final_base}.mp4"
+        pending = []
+        for idx, (start, duration) in enumerate(cuts, start=1):
+            final_name = output_dir / f"{stem}_parte_{idx}.mp4"
+            produced.append(final_name)
 
             # If final exists and we are not forcing reprocess, skip processing this part
-            if final_name.exists() and not force_reprocess:
+            if final_name.name in existing and not force_reprocess:
                 print(f'Parte {idx}: arquivo final já existe, pulando (use --force-reprocess para regenerar): {final_name}')
-                produced.append(final_name)
                 continue
 
             # if forcing reprocess and file exists, remove it so we overwrite cleanly
-            if final_name.exists() and force_reprocess:
+            if final_name.name in existing and force_reprocess:
                 try:
                     final_name.unlink()
                 except Exception:
                     pass
+            pending.append((idx, start, duration, final_name))
+
+        # All parts share the same title/subtitle, so when every part must be (re)generated encode the
+        # whole source once and let the segment muxer cut it; otherwise process only the missing parts.
+        if pending and len(pending) == len(ranges):
+            # nothing on disk to line up with: start over from the exact ranges
+            entry.pop('cuts', None)
+            pending = [(idx, *ranges[idx - 1], final_name) for idx, _, _, final_name in pending]
+            print('Convertendo para 9:16 e dividindo em partes numa única passada...')
+            v_t0 = time.monotonic()
+            try:
+                convert_and_split(src_path, [p[3] for p in pending], [p[1] for p in pending[1:]],
+                                  title=title if title else None, subtitle=subtitle if subtitle else None,
+                                  target_w=1080, target_h=1920, source_size=source_size)
+                entry['done'] = [p[0] for p in pending]
+                _save_manifest_entry(output_dir, stem, entry)
+                pending = []
+                print(f'Passada única: {time.monotonic()-v_t0:.1f}s')
+            except Exception as e:
+                print('Passada única falhou, processando parte a parte:', e)
 
-            print('Adicionando textos (se houver)...')
-            add_t0 = time.monotonic()
-            # pass returned geometry so texts are placed close to the video rather than at canvas extremes
-            add_text(vertical, final_name, title=title if title else None, subtitle=subtitle if subtitle else None,
-                     video_geom=video_geom, target_w=1080, target_h=1920)
-            add_t1 = time.monotonic()
+        # the pending parts must meet the ones already on disk, so boundaries that are not
+        # keyframe-aligned (the exact ranges) are cut exactly, by re-encoding
+        exact = 'cuts' not in entry
+        if pending and len(pending) == len(ranges):
+            # stream copy only cuts cleanly on keyframes: with every part regenerated, snap the
+            # boundaries to them and record the snapped cuts for later partial runs
+            try:
+                snapped = snap_to_keyframes(ranges, probe_keyframes(src_path), total)
+                pending = [(idx, *snapped[idx - 1], final_name) for idx, _, _, final_name in pending]
+                entry['cuts'] = snapped
+                exact = False
+            except Exception as e:
+                print('Não foi possível alinhar as partes aos keyframes:', e)
 
-            seg_t1 = time.monotonic()
-            print(f'Parte {idx} tempos: extract={(seg_t1-seg_t0):.1f}s, convert={(v_t1-v_t0):.1f}s, add_text={(add_t1-add_t0):.1f}s')
-            produced.append(final_name)
+        if pending:
+            # parts are independent: run them concurrently, splitting the cores between the ffmpeg processes
+            cpus = os.cpu_count() or 2
+            workers = max(1, min(len(pending), cpus // 2 or 1))
+            threads = max(1, cpus // workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_process_part, src_path, tmpdir, idx, start, duration, final_name,
+                                    title, subtitle, threads, source_size, exact): idx
+                    for idx, start, duration, final_name in pending
+                }
+                for fut in as_completed(futures):
+                    fut.result()
+                    # record each finished part right away so an interrupted run resumes from here
+                    entry['done'] = sorted(set(entry['done']) | {futures[fut]})
+                    _save_manifest_entry(output_dir, stem, entry)
 
         print('Arquivos gerados:')
         for p in produced:
@@ -137,15 +293,71 @@ def run_split(url: str, parts: int = 3, title: str = '', subtitle: str = '', out
             pass
 
 
-def extract_segment_reencode(input_path, start, duration, out_path):
-    cmd = [
-        'ffmpeg', '-y', '-ss', str(start), '-i', str(input_path), '-t', str(duration),
-        '-c:v', 'libx264', '-preset', 'fast', '-crf', '20', '-c:a', 'aac', '-b:a', '128k', str(out_path)
-    ]
-    import subprocess
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError(proc.stderr)
+def run_split_many(urls: list[str], parts: int = 3, title: str = '', subtitle: str = '', out_dir: str | Path = 'downloads',
+                   force_reprocess: bool = False, force_redownload: bool = False, download_archive: str | None = None,
+                   cookies: str | None = None, cookies_from_browser: str | None = None,
+                   tmp_dir: str | Path | None = None):
+    """Run run_split for several URLs, downloading the next URL while the current one is processed.
+
+    All URLs go through youtube_utils.download_many (a single yt-dlp instance with concurrent
+    fragment downloads). A background worker pulls at most one source ahead (bounded like a queue of
+    size 1), so download time is hidden behind the ffmpeg work without piling up downloads on disk.
+    """
+    dl_kwargs = dict(force_redownload=force_redownload, download_archive=download_archive,
+                     cookies=cookies, cookies_from_browser=cookies_from_browser)
+    # one yt-dlp instance (with concurrent fragment downloads) for the whole batch
+    raw_dir, skip_if_exists, archive = _download_settings(out_dir, force_redownload, download_archive)
+    downloads = download_many(urls, raw_dir, skip_if_exists=skip_if_exists, max_height=720, download_archive=archive,
+                              cookies=cookies, cookies_from_browser=cookies_from_browser)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as downloader:
+            next_download = downloader.submit(next, downloads) if urls else None
+            for i, u in enumerate(urls):
+                print('\n==== Processando URL:', u)
+                try:
+                    src_path = next_download.result()
+                except Exception as e:
+                    print('Falha no download antecipado, tentando novamente:', e)
+                    src_path = None
+                next_download = downloader.submit(next, downloads) if i + 1 < len(urls) else None
+                run_split(u, parts=parts, title=title, subtitle=subtitle, out_dir=out_dir,
+                          force_reprocess=force_reprocess, src_path=src_path, tmp_dir=tmp_dir, **dl_kwargs)
+    finally:
+        downloads.close()
+
+
+def _process_part(src_path: Path, tmpdir: Path, idx: int, start: float, duration: float, final_name: Path,
+                  title: str, subtitle: str, threads: int | None = None,
+                  source_size: tuple[int, int] | None = None, exact: bool = False) -> Path:
+    """Extract one part and convert it to vertical 9:16 with texts. Runs in a worker thread.
+
+    The part is stream-copied and piped straight into the vertical/text encode; only when that
+    fails, or when `exact` asks for cut points that are not on keyframes, is it re-encoded to a
+    segment file in `tmpdir` and converted from there.
+    """
+    title = title if title else None
+    subtitle = subtitle if subtitle else None
+    # convert to vertical 9:16 and add texts (if present) in a single encode; texts are placed
+    # close to the video rather than at canvas extremes
+    print(f'Parte {idx}: extraindo (start={start} duration={duration}), convertendo para 9:16 e adicionando textos (se houver)...')
+    v_t0 = time.monotonic()
+    piped = False
+    if not exact:
+        try:
+            convert_and_annotate(src_path, final_name, title=title, subtitle=subtitle, target_w=1080, target_h=1920,
+                                 threads=threads, source_size=source_size, segment=(start, duration))
+            piped = True
+        except Exception as e:
+            print('Extração via pipe falhou, tentando re-encode para segment_tmp:', e)
+    if not piped:
+        segment_tmp = tmpdir / f'segment_{idx}.mp4'
+        extract_segment_reencode(src_path, start, duration, segment_tmp, threads=threads)
+        convert_and_annotate(segment_tmp, final_name, title=title, subtitle=subtitle, target_w=1080, target_h=1920,
+                             threads=threads, source_size=source_size)
+    v_t1 = time.monotonic()
+
+    print(f'Parte {idx} tempos: extract+convert+texto={(v_t1-v_t0):.1f}s')
+    return final_name
 
 
 if __name__ == '__main__':
@@ -161,11 +373,13 @@ if __name__ == '__main__':
         parser.add_argument('--download-archive', default=None, help='Arquivo de archive para yt-dlp (download-archive)')
         parser.add_argument('--cookies', default=None, help='Caminho para cookies.txt (Netscape)')
         parser.add_argument('--cookies-from-browser', default=None, help='Extrair cookies do navegador (e.g. chrome, firefox)')
+        parser.add_argument('--tmp-dir', default=None,
+                            help='Pasta para arquivos temporários (padrão: /dev/shm no Linux se houver espaço, '
+                                 'usa RAM; senão a pasta temporária do sistema)')
         args = parser.parse_args()
-        for u in args.url:
-            print('\n==== Processando URL:', u)
-            run_split(u, parts=args.parts, title=args.title, subtitle=args.subtitle, out_dir=args.out_dir,
-                      force_reprocess=args.force_reprocess, force_redownload=args.force_redownload,
-                      download_archive=args.download_archive, cookies=args.cookies, cookies_from_browser=args.cookies_from_browser)
+        run_split_many(args.url, parts=args.parts, title=args.title, subtitle=args.subtitle, out_dir=args.out_dir,
+                       force_reprocess=args.force_reprocess, force_redownload=args.force_redownload,
+                       download_archive=args.download_archive, cookies=args.cookies, cookies_from_browser=args.cookies_from_browser,
+                       tmp_dir=args.tmp_dir)
 
     main()
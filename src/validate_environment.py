@@ -10,23 +10,40 @@ import re
 import sys
 import shutil
 import subprocess
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
 from urllib.parse import urlparse
 
-TWEET_RE = re.compile(
-    r'^https?://(?:www\.)?(?:x\.com|twitter\.com)/[^/]+/(?:status|statuses)/(?P<id>\d+)', re.IGNORECASE
-)
+# casado contra a URL já em minúsculas, então sem re.IGNORECASE (evita o case folding do regex)
+TWEET_RE = re.compile(r'^https?://(?:www\.)?(?:x\.com|twitter\.com)/[^/]+/status(?:es)?/(?P<id>\d+)')
+# método ligado resolvido uma vez; evita o lookup de atributo a cada URL
+_TWEET_MATCH = TWEET_RE.match
 
 def extract_tweet_id(url: str):
-    m = TWEET_RE.match(url.strip())
-    if not m:
+    u = url.strip().lower()
+    # atalho: URL que nem menciona x.com/twitter.com não passa pelo regex
+    if 'x.com' not in u and 'twitter.com' not in u:
         return None
-    return m.group('id')
+    m = _TWEET_MATCH(u)
+    return m[1] if m else None
 
+# o PATH não muda durante a execução: cada executável é procurado uma vez só
+@lru_cache(maxsize=None)
 def check_executable(name: str):
     path = shutil.which(name)
     return path
 
-def check_command_version(cmd:list):
+def python_package_version(name: str):
+    """Versão de um pacote instalado lida dos metadados (sem lançar processo), ou None."""
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+# a versão de um executável não muda enquanto o processo roda: cada comando é lançado no máximo uma vez
+@lru_cache(maxsize=None)
+def check_command_version(cmd: tuple):
     try:
         out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=5)
         if out.returncode == 0:
@@ -53,14 +70,17 @@ def validate(url1: str, url2: str):
     ffmpeg_path = check_executable('ffmpeg')
     ffprobe_path = check_executable('ffprobe') or ffmpeg_path
     
-    yt_ver = check_command_version(['yt-dlp', '--version']) if yt_path else None
-    ffmpeg_ver = check_command_version(['ffmpeg', '-version']) if ffmpeg_path else None
-    ffprobe_ver = check_command_version(['ffprobe', '-version']) if ffprobe_path else None
+    # yt-dlp: versão do pacote Python (a mesma que o CLI reporta), sem lançar o executável.
+    # ffmpeg: uma única chamada -version (em cache); o ffprobe vem da mesma build e só é localizado
+    yt_ver = python_package_version('yt-dlp') if yt_path else None
+    if yt_path and not yt_ver:
+        yt_ver = check_command_version((yt_path, '--version'))
+    ffmpeg_ver = check_command_version((ffmpeg_path, '-version')) if ffmpeg_path else None
 
     print("URLs válidas. IDs extraídos:", ids)
     print("yt-dlp:", yt_path or "não encontrado", f"versão: {yt_ver or 'desconhecida'}")
     print("ffmpeg:", ffmpeg_path or "não encontrado", f"versão: {ffmpeg_ver or 'desconhecida'}")
-    print("ffprobe:", ffprobe_path or "não encontrado", f"versão: {ffprobe_ver or 'desconhecida'}")
+    print("ffprobe:", ffprobe_path or "não encontrado")
 
     ok = bool(yt_path and ffmpeg_path)
     if not ok:
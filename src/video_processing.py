@@ -4,53 +4,279 @@ Uses ffmpeg CLI via subprocess. Designed for cross-platform use (Windows/macOS/L
 """
 from __future__ import annotations
 import shlex
+import shutil
 import subprocess
+import tempfile
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
-import json
+from typing import Callable, Optional, Tuple
+import os
+import re
+
+try:
+    # orjson is optional; parses ffprobe's JSON (bytes) faster than the stdlib
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+
+# no console window per ffmpeg/ffprobe on Windows (each part spawns several); fds are not inherited
+_SPAWN_KWARGS = {'close_fds': True}
+if os.name == 'nt':
+    _SPAWN_KWARGS['creationflags'] = subprocess.CREATE_NO_WINDOW
+
+# executables resolved once at import (the launcher puts ffmpeg/bin on PATH before that), so
+# subprocess does not search PATH again on every spawn (costly on Windows because of PATHEXT)
+_FFMPEG = shutil.which('ffmpeg') or 'ffmpeg'
+_FFPROBE = shutil.which('ffprobe') or 'ffprobe'
+
+# only the end of ffmpeg's stderr is kept, to be shown when a command fails
+_STDERR_TAIL_LINES = 200
+
+
+def _quiet(cmd: list[str]) -> list[str]:
+    """Drop ffmpeg's progress/info output: only errors reach stderr (options given later still win)."""
+    return [cmd[0], '-nostats', '-loglevel', 'error', *cmd[1:]]
+
+
+def _stderr_tail(proc: subprocess.Popen) -> str:
+    """Drain proc.stderr line by line, keeping only the last lines, and wait for the process."""
+    tail = deque(proc.stderr, maxlen=_STDERR_TAIL_LINES)
+    proc.wait()
+    return ''.join(tail)
 
 
 def ffmpeg_run(cmd: list[str]):
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+    proc = subprocess.Popen(_quiet(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, errors='replace', **_SPAWN_KWARGS)
+    err = _stderr_tail(proc)
     if proc.returncode != 0:
-        raise RuntimeError(f"ffmpeg failed:\nSTDOUT:{proc.stdout}\nSTDERR:{proc.stderr}")
+        raise RuntimeError(f"ffmpeg failed:\nSTDERR:{err}")
+    return proc
+
+
+def ffmpeg_pipe(source_cmd: list[str], cmd: list[str]):
+    """Run `source_cmd | cmd`: the first ffmpeg writes to stdout (pipe:1), the second reads it as pipe:0.
+
+    Used to hand a segment from one ffmpeg stage to the next without writing it to disk.
+    """
+    with tempfile.TemporaryFile() as src_err:
+        src = subprocess.Popen(source_cmd, stdout=subprocess.PIPE, stderr=src_err, **_SPAWN_KWARGS)
+        try:
+            proc = subprocess.Popen(_quiet(cmd), stdin=src.stdout, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, text=True, errors='replace', **_SPAWN_KWARGS)
+        finally:
+            # only the consumer keeps the read end, so the source gets EPIPE if the consumer dies
+            src.stdout.close()
+        err = _stderr_tail(proc)
+        src_rc = src.wait()
+        # a failed consumer kills the source with EPIPE: its error is the informative one
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed:\nSTDERR:{err}")
+        if src_rc != 0:
+            src_err.seek(0)
+            raise RuntimeError(f"ffmpeg (source) failed:\nSTDERR:{src_err.read().decode(errors='replace')}")
     return proc
 
 
+# mp4 outputs get the moov atom at the start, so players/ffprobe/later passes need not seek to the end
+FASTSTART = ['-movflags', '+faststart']
+
+# settings for throwaway intermediate encodes: ~4-8x faster than 'fast', the bigger file does not matter
+INTERMEDIATE_PRESET = 'ultrafast'
+INTERMEDIATE_TUNE = 'zerolatency'
+
+# hardware H.264 encoders, in order of preference (concat_videos uses the same pick)
+_HW_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf')
+
+
+@lru_cache(maxsize=1)
+def pick_encoder() -> str:
+    """Return the first usable hardware H.264 encoder, else 'libx264' (cached).
+
+    Being listed in `ffmpeg -encoders` does not mean the device exists (e.g. an NVENC
+    build on a machine without an NVIDIA GPU), so each candidate is validated with a tiny
+    test encode. h264_vaapi is not tried: it needs a device and hwupload in the filter chain.
+    """
+    try:
+        proc = subprocess.run([_FFMPEG, '-hide_banner', '-encoders'], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True, timeout=10, **_SPAWN_KWARGS)
+    except Exception:
+        return 'libx264'
+    for enc in (e for e in _HW_ENCODERS if e in proc.stdout):
+        test = [_FFMPEG, '-hide_banner', '-v', 'error', '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+                '-c:v', enc, '-f', 'null', '-']
+        try:
+            if subprocess.run(test, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15,
+                              **_SPAWN_KWARGS).returncode == 0:
+                return enc
+        except Exception:
+            continue
+    return 'libx264'
+
+
+def encoder_args(encoder: str, crf: int = 18, preset: str = 'fast', tune: Optional[str] = None) -> list[str]:
+    """-c:v arguments for the given encoder with a quality roughly equivalent to libx264 `crf`.
+
+    `preset`/`tune` are libx264 names; for intermediates that are re-encoded anyway use
+    INTERMEDIATE_PRESET and INTERMEDIATE_TUNE (NVENC then uses its fastest preset too).
+    """
+    # the hardware constant-quality scales run a little sharper than libx264's crf at the same number
+    q = crf + 2
+    if encoder == 'h264_nvenc':
+        return ['-c:v', encoder, '-preset', 'p1' if preset == INTERMEDIATE_PRESET else 'p4', '-rc', 'vbr', '-cq', str(q), '-b:v', '0']
+    if encoder == 'h264_qsv':
+        return ['-c:v', encoder, '-global_quality', str(q)]
+    if encoder == 'h264_videotoolbox':
+        # quality 1-100, higher is better
+        return ['-c:v', encoder, '-q:v', str(max(1, min(100, 100 - 2 * crf)))]
+    if encoder == 'h264_amf':
+        return ['-c:v', encoder, '-rc', 'cqp', '-qp_i', str(q), '-qp_p', str(q)]
+    tune_args = ['-tune', tune] if tune else []
+    return ['-c:v', 'libx264', '-preset', preset, *tune_args, '-crf', str(crf)]
+
+
+def run_encode(build: Callable[[list[str], list[str]], list[str]], crf: int = 18, preset: str = 'fast',
+               source_cmd: Optional[list[str]] = None, tune: Optional[str] = None):
+    """Run an encode using the picked encoder, falling back to libx264 if the hardware one fails.
+
+    `build(input_args, video_args)` must return the ffmpeg command: input_args go right before
+    `-i` (hardware decode when a hardware encoder is used) and video_args replace `-c:v ...`.
+    If `source_cmd` is given the encode reads its input from that command's stdout (`-i pipe:0`);
+    the source is restarted for the libx264 retry.
+    """
+    def run(cmd):
+        return ffmpeg_run(cmd) if source_cmd is None else ffmpeg_pipe(source_cmd, cmd)
+
+    encoder = pick_encoder()
+    if encoder != 'libx264':
+        try:
+            return run(build(['-hwaccel', 'auto'], encoder_args(encoder, crf, preset, tune)))
+        except RuntimeError as e:
+            print(f'{encoder} failed, retrying with libx264:', e)
+    return run(build([], encoder_args('libx264', crf, preset, tune)))
+
+
 def extract_segment(input_path: Path, start: float, duration: float, out_path: Path) -> None:
     """Extract a segment using -ss (start) and -t (duration) without re-encoding (copy) when possible."""
     cmd = [
-        'ffmpeg',
+        _FFMPEG,
         '-y',
         '-ss', str(start),
         '-i', str(input_path),
         '-t', str(duration),
         '-c', 'copy',
+        *FASTSTART,
         str(out_path),
     ]
     ffmpeg_run(cmd)
 
 
-def convert_to_vertical(input_path: Path, out_path: Path, target_w: int = 1080, target_h: int = 1920) -> None:
-    """Convert a source video to vertical 9:16 while keeping content centered.
+def extract_segment_reencode(input_path: Path, start: float, duration: float, out_path: Path,
+                             threads: Optional[int] = None) -> None:
+    """Extract a segment by re-encoding it (exact cut points), for when the copy in extract_segment fails.
 
-    Strategy:
-    - scale the input so the smaller dimension fits the target
-    - crop (center) or pad if necessary to reach exact target
+    The output is an intermediate that gets encoded again, so the fast intermediate settings are used.
     """
-    # Determine source size using ffprobe so we can compute the scaled size and overlay position
+    thread_args = ['-threads', str(threads)] if threads else []
+    run_encode(lambda hw, venc: [
+        _FFMPEG, '-y', *hw, '-ss', str(start), '-i', str(input_path), '-t', str(duration),
+        *venc, '-c:a', 'aac', '-b:a', '128k', *thread_args, *FASTSTART, str(out_path)
+    ], crf=20, preset=INTERMEDIATE_PRESET, tune=INTERMEDIATE_TUNE)
+
+
+def segment_source_cmd(input_path: Path, start: float, duration: float) -> list[str]:
+    """ffmpeg command that stream-copies a segment to stdout, to be read by the next stage as pipe:0.
+
+    Matroska is used as the pipe container since it streams without seeking and, unlike mpegts,
+    carries every codec yt-dlp may deliver (H.264/VP9/AV1 with AAC/Opus).
+    """
+    return [
+        _FFMPEG, '-v', 'error',
+        '-ss', str(start),
+        '-i', str(input_path),
+        '-t', str(duration),
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-c', 'copy',
+        '-f', 'matroska', 'pipe:1',
+    ]
+
+
+def probe_keyframes(input_path: Path) -> list[float]:
+    """Return the keyframe timestamps (seconds) of the first video stream.
+
+    Reads packet flags only (no decoding), so it is fast even for long sources.
+    """
+    cmd = [
+        _FFPROBE, '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', str(input_path)
+    ]
+    # one line per packet: parsed as bytes (float() accepts them), skipping a decode of the whole output
+    proc = subprocess.run(cmd, capture_output=True, **_SPAWN_KWARGS)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {proc.stderr.decode(errors='replace')}")
+    keyframes = []
+    for line in proc.stdout.splitlines():
+        pts, _, flags = line.partition(b',')
+        if b'K' in flags:
+            try:
+                keyframes.append(float(pts))
+            except ValueError:
+                continue
+    keyframes.sort()
+    return keyframes
+
+
+def snap_to_keyframes(ranges: list[tuple[float, float]], keyframes: list[float],
+                      total: float) -> list[tuple[float, float]]:
+    """Move each part start back to the closest keyframe at or before it.
+
+    `-c copy` can only cut cleanly on keyframes; snapping keeps the parts contiguous
+    (each duration ends where the next part starts) so stream copy rarely needs the
+    re-encode fallback. A start is left untouched if snapping would collapse it onto
+    the previous part's start.
+    """
+    starts = []
+    for start, _ in ranges:
+        i = bisect_right(keyframes, start + 1e-3) - 1
+        snapped = keyframes[i] if i >= 0 else start
+        if starts and snapped <= starts[-1]:
+            snapped = start
+        starts.append(round(snapped, 3))
+    ends = starts[1:] + [total]
+    return [(s, round(e - s, 3)) for s, e in zip(starts, ends)]
+
+
+def _probe_dimensions(input_path: Path) -> Tuple[int, int]:
+    """Return (width, height) of the first video stream using ffprobe."""
     probe_cmd = [
-        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        _FFPROBE, '-v', 'error', '-select_streams', 'v:0',
         '-show_entries', 'stream=width,height', '-of', 'json', str(input_path)
     ]
-    proc = subprocess.run(probe_cmd, capture_output=True, text=True)
+    proc = subprocess.run(probe_cmd, capture_output=True, **_SPAWN_KWARGS)
     if proc.returncode != 0:
-        raise RuntimeError(f"ffprobe failed: {proc.stderr}")
-    info = json.loads(proc.stdout)
+        raise RuntimeError(f"ffprobe failed: {proc.stderr.decode(errors='replace')}")
+    info = _json_loads(proc.stdout)
     stream = info.get('streams', [])[0]
-    iw = int(stream.get('width', 0))
-    ih = int(stream.get('height', 0))
+    return int(stream.get('width', 0)), int(stream.get('height', 0))
+
+
+@lru_cache(maxsize=256)
+def _probe_dimensions_cached(path: str, mtime_ns: int, size: int) -> Tuple[int, int]:
+    # mtime_ns/size are part of the key so a rewritten file is probed again
+    return _probe_dimensions(Path(path))
+
+
+def get_video_dimensions(input_path: Path) -> Tuple[int, int]:
+    """(width, height) of the first video stream, memoized by (path, mtime, size)."""
+    st = Path(input_path).stat()
+    return _probe_dimensions_cached(str(Path(input_path).resolve()), st.st_mtime_ns, st.st_size)
+
 
+def _vertical_geometry(iw: int, ih: int, target_w: int, target_h: int) -> Tuple[int, int, int, int]:
+    """Compute (scaled_w, scaled_h, overlay_x, overlay_y) fitting iw x ih inside the target canvas."""
     # compute scale that fits inside target (keep aspect)
     scale = min(target_w / iw, target_h / ih)
     scaled_w = int(iw * scale)
@@ -58,30 +284,81 @@ def convert_to_vertical(input_path: Path, out_path: Path, target_w: int = 1080,
 
     overlay_x = (target_w - scaled_w) // 2
     overlay_y = (target_h - scaled_h) // 2
+    return scaled_w, scaled_h, overlay_x, overlay_y
+
 
+def _vertical_filter(geom: Tuple[int, int, int, int], target_w: int, target_h: int) -> str:
+    scaled_w, scaled_h, overlay_x, overlay_y = geom
     # Use scale filter to ensure the video covers the target area, then pad center
-    vf = (
-        f"scale={scaled_w}:{scaled_h},pad={target_w}:{target_h}:{overlay_x}:{overlay_y},setsar=1"
-    )
-    cmd = [
-        'ffmpeg', '-y', '-i', str(input_path), '-vf', vf, '-c:v', 'libx264', '-preset', 'fast', '-crf', '18',
-        '-c:a', 'aac', '-b:a', '128k', str(out_path)
-    ]
-    ffmpeg_run(cmd)
+    return f"scale={scaled_w}:{scaled_h},pad={target_w}:{target_h}:{overlay_x}:{overlay_y},setsar=1"
+
+
+def convert_to_vertical(input_path: Path, out_path: Path, target_w: int = 1080, target_h: int = 1920,
+                        source_size: Optional[Tuple[int, int]] = None, crf: int = 18, preset: str = 'fast') -> None:
+    """Convert a source video to vertical 9:16 while keeping content centered.
+
+    Strategy:
+    - scale the input so the smaller dimension fits the target
+    - crop (center) or pad if necessary to reach exact target
+
+    `source_size` (width, height) skips the ffprobe call when the caller already knows it.
+    Pass preset=INTERMEDIATE_PRESET when the output is only an input for another encode.
+    """
+    # Determine source size using ffprobe so we can compute the scaled size and overlay position
+    iw, ih = source_size or get_video_dimensions(input_path)
+    geom = _vertical_geometry(iw, ih, target_w, target_h)
+
+    vf = _vertical_filter(geom, target_w, target_h)
+    run_encode(lambda hw, venc: [
+        _FFMPEG, '-y', *hw, '-i', str(input_path), '-vf', vf, *venc,
+        '-c:a', 'aac', '-b:a', '128k', *FASTSTART, str(out_path)
+    ], crf=crf, preset=preset, tune=INTERMEDIATE_TUNE if preset == INTERMEDIATE_PRESET else None)
 
     # return geometry so callers can position text relative to the video content
-    return scaled_w, scaled_h, overlay_x, overlay_y
+    return geom
 
 
-def add_text(input_path: Path, out_path: Path, title: Optional[str] = None, subtitle: Optional[str] = None,
-             title_font: str = 'Arial', subtitle_font: str = 'Arial',
-             video_geom: Optional[Tuple[int,int,int,int]] = None, target_w: int = 1080, target_h: int = 1920) -> None:
-    """Add optional title (yellow, top) and subtitle (white, bottom) using drawtext.
+_OPTION_SPECIAL = re.compile(r"([\\':])")
+_GRAPH_SPECIAL = re.compile(r"([\\'\[\],;])")
 
-    The function will skip a text if the string is empty or None.
-    Requires ffmpeg built with libfreetype (most official builds include it).
+# bundled fonts (src/assets) first, then the usual system font directories
+_FONT_DIRS = [Path(__file__).parent / 'assets',
+              Path(os.environ.get('WINDIR', 'C:/Windows')) / 'Fonts',
+              Path('/Library/Fonts'), Path('/System/Library/Fonts/Supplemental'),
+              Path('/usr/share/fonts/truetype/msttcorefonts'), Path('/usr/share/fonts/truetype/dejavu'),
+              Path('/usr/share/fonts/TTF')]
+_FALLBACK_FONT_FILE = 'DejaVuSans.ttf'
+
+
+@lru_cache(maxsize=None)
+def resolve_font_file(font: str) -> Optional[str]:
+    """Return the absolute path of a .ttf for `font` (e.g. 'Arial'), or None if none is found.
+
+    Giving drawtext a fontfile= skips the fontconfig lookup it does for font= on every run.
+    The result is cached per font name.
     """
+    names = [f'{font}.ttf', f'{font.lower()}.ttf', _FALLBACK_FONT_FILE]
+    for name in names:
+        for d in _FONT_DIRS:
+            candidate = d / name
+            if candidate.is_file():
+                return str(candidate.resolve())
+    return None
+
+
+def _font_option(font: str) -> str:
+    path = resolve_font_file(font)
+    if path:
+        return f"fontfile={escape_text(Path(path).as_posix())}"
+    return f"font={escape_text(font)}"
+
+
+def _drawtext_filters(title: Optional[str], subtitle: Optional[str], title_font: str, subtitle_font: str,
+                      video_geom: Optional[Tuple[int,int,int,int]], target_h: int) -> list[str]:
+    """Build the drawtext filters for the optional title (yellow, top) and subtitle (white, bottom)."""
     filters = []
+    title_opts = f"drawtext={_font_option(title_font)}:expansion=none:text={escape_text(title)}" if title else ''
+    subtitle_opts = f"drawtext={_font_option(subtitle_font)}:expansion=none:text={escape_text(subtitle)}" if subtitle else ''
 
     # If video geometry provided (scaled_w, scaled_h, overlay_x, overlay_y), position text close to the video
     if video_geom:
@@ -98,7 +375,7 @@ def add_text(input_path: Path, out_path: Path, title: Optional[str] = None, subt
             if title_y < 4:
                 title_y = overlay_y + margin
             filters.append(
-                f"drawtext=font='{title_font}':text='{escape_text(title)}':fontcolor=yellow:fontsize={title_fs}:x=(w-text_w)/2:y={title_y}:box=1:boxcolor=black@0.4:boxborderw=10"
+                f"{title_opts}:fontcolor=yellow:fontsize={title_fs}:x=(w-text_w)/2:y={title_y}:box=1:boxcolor=black@0.4:boxborderw=10"
             )
 
         if subtitle:
@@ -107,7 +384,7 @@ def add_text(input_path: Path, out_path: Path, title: Optional[str] = None, subt
             if subtitle_y + subtitle_fs + margin > target_h - 4:
                 subtitle_y = overlay_y + scaled_h - subtitle_fs - margin
             filters.append(
-                f"drawtext=font='{subtitle_font}':text='{escape_text(subtitle)}':fontcolor=white:fontsize={subtitle_fs}:x=(w-text_w)/2:y={subtitle_y}:box=1:boxcolor=black@0.4:boxborderw=8"
+                f"{subtitle_opts}:fontcolor=white:fontsize={subtitle_fs}:x=(w-text_w)/2:y={subtitle_y}:box=1:boxcolor=black@0.4:boxborderw=8"
             )
     else:
         # fallback to previous behavior (positions relative to full canvas)
@@ -115,22 +392,118 @@ def add_text(input_path: Path, out_path: Path, title: Optional[str] = None, subt
         # and subtitle um pouco acima da borda inferior, usando tamanhos relativas à altura (responsivo)
         if title:
             filters.append(
-                f"drawtext=font='{title_font}':text='{escape_text(title)}':fontcolor=yellow:fontsize=trunc(h*0.09):x=(w-text_w)/2:y=h*0.08:box=1:boxcolor=black@0.4:boxborderw=10"
+                f"{title_opts}:fontcolor=yellow:fontsize=trunc(h*0.09):x=(w-text_w)/2:y=h*0.08:box=1:boxcolor=black@0.4:boxborderw=10"
             )
         if subtitle:
             filters.append(
-                f"drawtext=font='{subtitle_font}':text='{escape_text(subtitle)}':fontcolor=white:fontsize=trunc(h*0.06):x=(w-text_w)/2:y=h-text_h-h*0.06:box=1:boxcolor=black@0.4:boxborderw=8"
+                f"{subtitle_opts}:fontcolor=white:fontsize=trunc(h*0.06):x=(w-text_w)/2:y=h-text_h-h*0.06:box=1:boxcolor=black@0.4:boxborderw=8"
             )
+    return filters
+
+
+def add_text(input_path: Path, out_path: Path, title: Optional[str] = None, subtitle: Optional[str] = None,
+             title_font: str = 'Arial', subtitle_font: str = 'Arial',
+             video_geom: Optional[Tuple[int,int,int,int]] = None, target_w: int = 1080, target_h: int = 1920,
+             crf: int = 18, preset: str = 'fast') -> None:
+    """Add optional title (yellow, top) and subtitle (white, bottom) using drawtext.
+
+    The function will skip a text if the string is empty or None. With no text at all the
+    input file is moved (renamed, when on the same filesystem) to out_path, not copied.
+    Requires ffmpeg built with libfreetype (most official builds include it).
+    """
+    filters = _drawtext_filters(title, subtitle, title_font, subtitle_font, video_geom, target_h)
     if not filters:
-        # nothing to do, copy
-        cmd = ['ffmpeg', '-y', '-i', str(input_path), '-c', 'copy', str(out_path)]
-        ffmpeg_run(cmd)
+        # nothing to draw: no remux needed, just move the file
+        shutil.move(str(input_path), str(out_path))
         return
     vf = ','.join(filters)
-    cmd = ['ffmpeg', '-y', '-i', str(input_path), '-vf', vf, '-c:v', 'libx264', '-preset', 'fast', '-crf', '18', '-c:a', 'aac', '-b:a', '128k', str(out_path)]
-    ffmpeg_run(cmd)
+    run_encode(lambda hw, venc: [_FFMPEG, '-y', *hw, '-i', str(input_path), '-vf', vf, *venc, '-c:a', 'aac', '-b:a', '128k',
+                                 *FASTSTART, str(out_path)],
+               crf=crf, preset=preset, tune=INTERMEDIATE_TUNE if preset == INTERMEDIATE_PRESET else None)
+
+
+def convert_and_annotate(input_path: Path, out_path: Path, title: Optional[str] = None, subtitle: Optional[str] = None,
+                         target_w: int = 1080, target_h: int = 1920,
+                         title_font: str = 'Arial', subtitle_font: str = 'Arial',
+                         threads: Optional[int] = None,
+                         source_size: Optional[Tuple[int, int]] = None,
+                         segment: Optional[Tuple[float, float]] = None,
+                         crf: int = 18, preset: str = 'fast') -> Tuple[int, int, int, int]:
+    """Convert to vertical 9:16 and draw the optional texts in a single ffmpeg encode.
+
+    Equivalent to convert_to_vertical followed by add_text, but the video is decoded and
+    encoded only once and no intermediate file is written. Returns the video geometry.
+    `threads` caps ffmpeg's threads when several parts are encoded concurrently and
+    `source_size` (width, height) skips the ffprobe call when the caller already knows it.
+    `segment` (start, duration) encodes only that part of the input: it is stream-copied by a
+    first ffmpeg and piped into the encoder, so no segment file is written to disk.
+    """
+    iw, ih = source_size or get_video_dimensions(input_path)
+    geom = _vertical_geometry(iw, ih, target_w, target_h)
+    filters = [_vertical_filter(geom, target_w, target_h)]
+    filters += _drawtext_filters(title, subtitle, title_font, subtitle_font, geom, target_h)
+    thread_args = ['-threads', str(threads)] if threads else []
+    if segment is not None:
+        source_cmd = segment_source_cmd(input_path, *segment)
+        input_args = ['-f', 'matroska', '-i', 'pipe:0']
+    else:
+        source_cmd = None
+        input_args = ['-i', str(input_path)]
+    run_encode(lambda hw, venc: [
+        _FFMPEG, '-y', *hw, *input_args, '-vf', ','.join(filters), *venc,
+        '-c:a', 'aac', '-b:a', '128k', *thread_args, *FASTSTART, str(out_path)
+    ], crf=crf, preset=preset, source_cmd=source_cmd)
+    return geom
+
+
+def convert_and_split(input_path: Path, out_paths: list[Path], split_times: list[float],
+                      title: Optional[str] = None, subtitle: Optional[str] = None,
+                      target_w: int = 1080, target_h: int = 1920,
+                      title_font: str = 'Arial', subtitle_font: str = 'Arial',
+                      source_size: Optional[Tuple[int, int]] = None,
+                      crf: int = 18, preset: str = 'fast') -> Tuple[int, int, int, int]:
+    """Convert the whole source to vertical 9:16 (with texts) in ONE encode and split it into parts.
+
+    Uses ffmpeg's segment muxer: `split_times` are the start times of parts 2..N, so
+    len(out_paths) must be len(split_times) + 1. Keyframes are forced at the split points
+    so every part starts exactly where requested. Parts are written to the directory of
+    the first out_path and then renamed to out_paths. Returns the video geometry.
+    """
+    if len(out_paths) != len(split_times) + 1:
+        raise ValueError('out_paths must have one entry more than split_times')
+    iw, ih = source_size or get_video_dimensions(input_path)
+    geom = _vertical_geometry(iw, ih, target_w, target_h)
+    filters = [_vertical_filter(geom, target_w, target_h)]
+    filters += _drawtext_filters(title, subtitle, title_font, subtitle_font, geom, target_h)
+    times = ','.join(f'{t:.3f}' for t in split_times)
+    work_dir = Path(out_paths[0]).parent
+    pattern = work_dir / '.split_parte_%d.mp4'
+    if split_times:
+        out_args = ['-force_key_frames', times, '-f', 'segment', '-segment_times', times,
+                    '-segment_start_number', '1', '-reset_timestamps', '1',
+                    '-segment_format_options', 'movflags=+faststart', str(pattern)]
+    else:
+        out_args = [*FASTSTART, str(out_paths[0])]
+    try:
+        run_encode(lambda hw, venc: [
+            _FFMPEG, '-y', *hw, '-i', str(input_path), '-map', '0:v:0', '-map', '0:a:0?', '-vf', ','.join(filters),
+            *venc, '-c:a', 'aac', '-b:a', '128k', *out_args
+        ], crf=crf, preset=preset)
+        if split_times:
+            for idx, out in enumerate(out_paths, start=1):
+                Path(str(pattern) % idx).replace(out)
+    finally:
+        # remove leftovers (e.g. after a failure halfway through)
+        for idx in range(1, len(out_paths) + 1):
+            Path(str(pattern) % idx).unlink(missing_ok=True)
+    return geom
 
 
 def escape_text(text: str) -> str:
-    # Minimal escaping for ffmpeg drawtext: escape single quotes by backslash
-    return text.replace("'", "\\'")
+    """Escape a value for an unquoted drawtext option inside a -vf/-filter_complex graph.
+
+    Two levels, as described in ffmpeg's "Quoting and escaping" docs: first the option value
+    (\\ ' :), then the filtergraph (\\ ' [ ] , ;). Drawtext's own %{...} expansion is disabled
+    by the filters with expansion=none, so % needs no escaping.
+    """
+    return _GRAPH_SPECIAL.sub(r'\\\1', _OPTION_SPECIAL.sub(r'\\\1', text))
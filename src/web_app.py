@@ -6,111 +6,365 @@ Aplicação web mínima (FastAPI) para enviar duas URLs de tweets/X e gerar o MP
 Uso:
   python -m uvicorn src.web_app:app --reload --host 127.0.0.1 --port 8000
 
+  Em Linux/macOS, com uvloop instalado (vem no uvicorn[standard]), prefira deixar explícito:
+  python -m uvicorn src.web_app:app --loop uvloop --host 127.0.0.1 --port 8000
+
+  Para HTTP/2 (vários envios/downloads multiplexados numa conexão), usar hypercorn (com TLS, ou
+  um nginx na frente fazendo o HTTP/2):
+  hypercorn src.web_app:app --bind 0.0.0.0:8000 --worker-class uvloop --certfile cert.pem --keyfile key.pem
+  Com --workers > 1 o estado dos jobs é compartilhado pelo jobs.db, mas o limite de splits
+  simultâneos (SPLIT_JOB_LIMIT) vale por processo.
+
 Observações:
-- Este é um exemplo síncrono e bem básico: submeter o formulário bloqueará a requisição até
-  o processamento terminar. Para produção, mover o processamento para background (Celery, tasks)
-  ou usar BackgroundTasks do FastAPI.
+- O merge roda em background (BackgroundTasks): o formulário retorna na hora com um job id e a
+  página /status/{job_id} se atualiza sozinha até o arquivo final ficar pronto.
+- O estado dos jobs (merge e split) fica em downloads/jobs.db (sqlite, WAL): sobrevive a reinícios
+  e pode ser consultado em /jobs/{job_id} (JSON) ou /status/{job_id} (HTML).
+- Os dois downloads do merge rodam em paralelo (threads), e pedidos simultâneos da mesma URL
+  compartilham um único download (_INFLIGHT); a análise + concat (merge_files) roda
+  num ProcessPoolExecutor (EXECUTOR): paralelismo real entre jobs e cada
+  processo é reciclado após alguns jobs, então memória acumulada não fica no servidor.
 """
 
+import asyncio
+import hashlib
+import html
 import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
 import time
+import urllib.parse
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, Form, Request, BackgroundTasks
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, File, Form, Request, BackgroundTasks, UploadFile
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response
+from fastapi.templating import Jinja2Templates
+
+# os módulos do pipeline se importam pelo nome (import run_pipeline); com a app carregada como
+# src.web_app a pasta src precisa estar no sys.path (os processos do pool herdam o sys.path)
+_SRC_DIR = str(Path(__file__).parent)
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+from run_pipeline import preload_steps
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# uvloop é opcional (não existe no Windows). O uvicorn já o usa com --loop auto (padrão); a policy
+# abaixo vale para quem sobe a app de outro jeito (ex.: asyncio.run com um servidor próprio)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# módulos do pipeline importados uma vez no startup (download/validação rodam em threads deste
+# processo); os processos do EXECUTOR importam as etapas do merge no initializer, que fica em
+# run_pipeline para o worker não precisar importar este módulo (jobs.db, templates, outro pool)
+_MAIN_MODULES = ('validate_environment', 'download_videos', 'split_youtube')
+
+# processos que executam o merge_files (ffmpeg já roda em subprocess, mas a cola em Python
+# segura o GIL); max_tasks_per_child recicla cada processo depois de 4 jobs.
+# No Windows o ProcessPoolExecutor aceita no máximo 61 workers
+_POOL_WORKERS = min(os.cpu_count() or 1, 61)
+EXECUTOR = ProcessPoolExecutor(max_workers=_POOL_WORKERS, max_tasks_per_child=4, initializer=preload_steps)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(preload_steps, _MAIN_MODULES)
+    # aquecer o pool: sobe os processos (e seus imports) antes do primeiro job
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(EXECUTOR, os.getpid) for _ in range(_POOL_WORKERS)))
+    yield
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI(title='projeto-kndauto - basic web UI')
+
+app = FastAPI(title='projeto-kndauto - basic web UI', lifespan=lifespan)
+# comprime respostas HTML (o formulário tem alguns KB): Brotli se brotli-asgi estiver instalado
+# (com gzip para clientes sem br), senão gzip
+if BrotliMiddleware is not None:
+    # os MP4 de /downloads não são comprimidos (já são comprimidos, e isso quebraria Range)
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=500, excluded_handlers=[r'^/downloads/'])
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# templates relativos ao módulo (não ao cwd); o index é compilado já na importação e fica no cache do Jinja2
+templates = Jinja2Templates(directory=str(Path(__file__).parent / 'templates'))
+templates.get_template('index.html')
 
 # Servir a pasta downloads para permitir o download do arquivo final
 os.makedirs('downloads', exist_ok=True)
-app.mount('/downloads', StaticFiles(directory='downloads'), name='downloads')
+_DOWNLOADS_DIR = Path('downloads').resolve()
+
+
+class _VideoFileResponse(FileResponse):
+    # blocos de 1 MiB (o padrão é 64 KiB): menos idas ao loop por MP4 servido
+    chunk_size = 1024 * 1024
+
+
+# os MP4 do merge têm no nome o hash das entradas (ver /merge): o conteúdo de um nome nunca muda
+_IMMUTABLE_DIR = _DOWNLOADS_DIR / 'twitter' / 'output_videos'
+_IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# o jobs.db (e os -wal/-shm do sqlite) fica em downloads mas não é servido: guarda caminhos e erros de todos os jobs
+_DB_PATH = _DOWNLOADS_DIR / 'jobs.db'
+
+
+@app.get('/downloads/{path:path}')
+async def downloads(path: str, request: Request):
+    """Serve os arquivos gerados com FileResponse: suporta Range e, em servidores com a extensão ASGI
+    `http.response.pathsend`, o envio do arquivo fica com o servidor (sendfile) sem passar por buffers Python.
+
+    Cada arquivo tem um ETag (mtime + tamanho) e um If-None-Match igual responde 304 sem corpo. Os
+    MP4 do merge são cacheados como immutable; as partes do split podem ser regeradas com o mesmo
+    nome, então o navegador revalida (no-cache) e recebe 304 enquanto não mudarem.
+    """
+    target = (_DOWNLOADS_DIR / path).resolve()
+    # não deixar sair da pasta downloads (../)
+    if (not target.is_relative_to(_DOWNLOADS_DIR) or not target.is_file()
+            or (target.parent == _DB_PATH.parent and target.name.lower().startswith(_DB_PATH.name))):
+        return HTMLResponse('<h3>Arquivo não encontrado</h3>', status_code=404)
+    st = target.stat()
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {'ETag': etag,
+               'Cache-Control': _IMMUTABLE_CACHE if target.is_relative_to(_IMMUTABLE_DIR) else 'no-cache'}
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in (t.strip() for t in if_none_match.split(',')) or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    return _VideoFileResponse(target, headers=headers, stat_result=st)
+
+
+# estado dos jobs (status: pending|running|done|error) numa tabela sqlite; WAL deixa o /status ler
+# enquanto um job escreve. Uma conexão compartilhada, serializada pelo lock (event loop + threads)
+DB = sqlite3.connect(str(_DB_PATH), check_same_thread=False, isolation_level=None)
+DB.execute('PRAGMA journal_mode=WAL')
+DB.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, out_path TEXT, '
+           'started REAL, finished REAL, error TEXT)')
+_db_lock = threading.Lock()
+
+
+def _create_job(job_id: str, kind: str, status: str = 'pending', out_path: str | None = None) -> None:
+    finished = time.time() if status == 'done' else None
+    with _db_lock:
+        DB.execute('INSERT INTO jobs (id, kind, status, out_path, started, finished) VALUES (?, ?, ?, ?, ?, ?)',
+                   (job_id, kind, status, out_path, time.time(), finished))
+
+
+def _update_job(job_id: str, status: str, out_path: str | None = None, error: str | None = None) -> None:
+    finished = time.time() if status in ('done', 'error') else None
+    with _db_lock:
+        DB.execute('UPDATE jobs SET status = ?, out_path = COALESCE(?, out_path), error = ?, finished = ? '
+                   'WHERE id = ?', (status, out_path, error, finished, job_id))
+
+
+def _get_job(job_id: str) -> dict | None:
+    with _db_lock:
+        cur = DB.execute('SELECT id, kind, status, out_path, started, finished, error FROM jobs WHERE id = ?',
+                         (job_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip((c[0] for c in cur.description), row))
+
+
+# limite de jobs de split simultâneos (cada um roda yt-dlp + vários ffmpeg); acima disso responde 503
+SPLIT_JOB_LIMIT = max(1, (os.cpu_count() or 2) - 1)
+# vagas ocupadas. Só é lido/escrito no event loop, e a checagem e a reserva ficam sem await entre
+# elas, então dois pedidos não passam pela mesma vaga
+_split_running = 0
+# com psutil instalado, também recusa jobs quando sobra menos que isso de RAM
+_MIN_FREE_MEMORY = 512 * 1024 * 1024
+
+
+def _split_busy_reason() -> str | None:
+    """Motivo para recusar um novo job de split agora, ou None se há capacidade."""
+    if _split_running >= SPLIT_JOB_LIMIT:
+        return f'Já há {SPLIT_JOB_LIMIT} processamento(s) em andamento'
+    if psutil is not None and psutil.virtual_memory().available < _MIN_FREE_MEMORY:
+        return 'Pouca memória livre no servidor'
+    return None
+
+
+# downloads em andamento por URL: um segundo pedido da mesma URL espera o primeiro em vez de baixar
+# de novo. Só é lido/escrito no event loop (sem await entre o get e o set), então não precisa de lock
+_INFLIGHT: dict[tuple, asyncio.Task] = {}
+
+
+async def _download_once(download, url: str, cookies: str | None) -> str:
+    """Roda download(url, 'downloads', cookies) numa thread, compartilhando o resultado com
+    pedidos simultâneos da mesma URL."""
+    key = (url, cookies)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(download, url, 'downloads', cookies))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # shield: se um job for cancelado, o download continua para os outros que o aguardam
+    return await asyncio.shield(task)
+
+
+def _save_upload(upload: UploadFile | None) -> str | None:
+    """Copia um cookies.txt enviado para um arquivo temporário, em blocos de 64 KiB.
+
+    O Starlette já guarda o upload num SpooledTemporaryFile (vai para o disco acima de 1 MiB), e a
+    cópia em blocos mantém a RAM constante qualquer que seja o tamanho. Quem chama remove o arquivo.
+    """
+    if upload is None or not upload.filename:
+        return None
+    with tempfile.NamedTemporaryFile(prefix='cookies_', suffix='.txt', delete=False) as f:
+        shutil.copyfileobj(upload.file, f, length=64 * 1024)
+    return f.name
+
+
+def _remove_file(path: str | None) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
 
 @app.get('/', response_class=HTMLResponse)
-def index():
-    html = '''
-    <html>
-      <head>
-        <title>Merge Tweets Vídeo - Básico</title>
-      </head>
-      <body>
-        <h2>Opções</h2>
-        <h3>1) Merge de 2 vídeos de tweets/X</h3>
-        <form action="/merge" method="post">
-          <label>URL do Tweet 1:</label><br>
-          <input type="text" name="url1" size="80" required><br><br>
-          <label>URL do Tweet 2:</label><br>
-          <input type="text" name="url2" size="80" required><br><br>
-            <label>Cookies (opcional, path para cookies.txt):</label><br>
-            <input type="text" name="cookies" size="80" placeholder="C:\\caminho\\cookies.txt"><br><br>
-            <label>Título do vídeo final (opcional):</label><br>
-            <input type="text" name="title" size="80" placeholder="Ex: Meu merge"><br><br>
-            <input type="checkbox" name="force_reencode"> Forçar re-encode (slower, mais compatível)<br><br>
-            <button type="submit">Gerar vídeo combinado</button>
-        </form>
-
-        <hr>
-        <h3>2) Split e converter vídeo do YouTube (9:16)</h3>
-        <form action="/split_youtube" method="post">
-          <label>URL do YouTube:</label><br>
-          <input type="text" name="url" size="80" required><br><br>
-          <label>Número de partes:</label><br>
-          <input type="number" name="parts" value="3" min="1"><br><br>
-          <label>Título (amarelo, opcional):</label><br>
-          <input type="text" name="title" size="80" placeholder="Ex: Meu vídeo"><br><br>
-          <label>Legenda (branca, opcional):</label><br>
-          <input type="text" name="subtitle" size="80" placeholder="Ex: @meu_usuario"><br><br>
-            <label>Cookies (opcional, path para cookies.txt):</label><br>
-            <input type="text" name="cookies" size="80" placeholder="C:\\caminho\\cookies.txt"><br><br>
-            <label>Cookies from browser (opcional, ex: chrome, firefox):</label><br>
-            <input type="text" name="cookies_from_browser" size="40" placeholder="chrome"><br><br>
-          <button type="submit">Gerar partes 9:16</button>
-        </form>
-      </body>
-    </html>
-    '''
-    return HTMLResponse(content=html)
+def index(request: Request):
+    return templates.TemplateResponse(request, 'index.html')
 
 
 @app.post('/merge')
-def merge(url1: str = Form(...), url2: str = Form(...), cookies: str = Form(None), title: str = Form(''), force_reencode: str = Form(None)):
-    """Endpoint simples que executa o pipeline e redireciona para o arquivo final na pasta downloads."""
-    # Importar localmente para evitar circular imports quando a app é importada
-    from run_pipeline import run_pipeline
+async def merge(background_tasks: BackgroundTasks, url1: str = Form(...), url2: str = Form(...), cookies: str = Form(None),
+                cookies_file: UploadFile | None = File(None), title: str = Form(''), force_reencode: str = Form(None)):
+    """Enfileira o pipeline em background e redireciona para a página de status do job."""
+    # Importar localmente para evitar circular imports quando a app é importada (já carregado no startup)
+    from run_pipeline import download, merge_files, safe_filename, validate_inputs
     # converter checkbox para boolean
     force = bool(force_reencode)
+    job_id = uuid.uuid4().hex
 
-    try:
-        # run_pipeline will place outputs under downloads/twitter/output_videos and return the chosen output path
-        out_path = run_pipeline(url1, url2, out_dir='downloads', output=None, title=title or '', cookies=cookies or None, force_reencode=force)
-    except Exception as e:
-        # Retornar uma página de erro simples
-        return HTMLResponse(f'<h3>Erro durante o processamento:</h3><pre>{e}</pre>', status_code=500)
+    # nome do arquivo final derivado das entradas: o mesmo pedido repetido reaproveita o MP4 já gerado
+    key = hashlib.sha256(f'{url1}|{url2}|{force}|{title or ""}'.encode()).hexdigest()[:16]
+    stem = f'{safe_filename(title)}_{key}' if title else f'output_{key}'
+    output_dir = _DOWNLOADS_DIR / 'twitter' / 'output_videos'
+    final_path = output_dir / f'{stem}.mp4'
+    if final_path.exists():
+        _create_job(job_id, 'merge', status='done', out_path=str(final_path))
+        return RedirectResponse(url=f'/status/{job_id}', status_code=303)
+    # um cookies.txt enviado tem prioridade sobre o caminho digitado
+    uploaded = await asyncio.to_thread(_save_upload, cookies_file)
+    cookies = uploaded or cookies
+    _create_job(job_id, 'merge')
+    partial = output_dir / f'{stem}.{job_id}.partial.mp4'
+
+    async def job():
+        _update_job(job_id, 'running')
+        try:
+            await asyncio.to_thread(validate_inputs, url1, url2)
+            # os dois downloads são independentes e limitados pela rede: em paralelo (threads), o tempo
+            # total fica perto do mais lento em vez da soma
+            p1, p2 = await asyncio.gather(_download_once(download, url1, cookies or None),
+                                          _download_once(download, url2, cookies or None))
+            # análise + concat rodam num processo do EXECUTOR; o event loop só espera o resultado.
+            # grava num .partial próprio do job (dois pedidos iguais ao mesmo tempo não escrevem no mesmo
+            # arquivo) e só renomeia no fim, para um MP4 incompleto nunca contar como pronto
+            await asyncio.get_running_loop().run_in_executor(
+                EXECUTOR, merge_files, p1, p2, 'downloads', str(partial), title or '', force)
+            os.replace(partial, final_path)
+        except Exception as e:
+            _remove_file(str(partial))
+            _update_job(job_id, 'error', error=str(e))
+            return
+        finally:
+            _remove_file(uploaded)
+        _update_job(job_id, 'done', out_path=str(final_path))
+
+    background_tasks.add_task(job)
+    return RedirectResponse(url=f'/status/{job_id}', status_code=303)
+
+
+@app.get('/jobs/{job_id}')
+def job_state(job_id: str):
+    """Estado de um job (merge ou split) em JSON: status, out_path, started/finished (epoch) e error."""
+    state = _get_job(job_id)
+    if state is None:
+        return JSONResponse({'error': 'job not found'}, status_code=404)
+    return state
+
+
+@app.get('/status/{job_id}', response_class=HTMLResponse)
+def status(job_id: str):
+    """Página de acompanhamento de um job (se atualiza a cada 2s enquanto não terminar)."""
+    state = _get_job(job_id)
+    if not state:
+        return HTMLResponse('<h3>Job não encontrado</h3><p><a href="/">&larr; Voltar</a></p>', status_code=404)
+
+    if state['status'] == 'error':
+        return HTMLResponse(f'<h3>Erro durante o processamento:</h3><pre>{html.escape(state["error"])}</pre>'
+                            '<p><a href="/">&larr; Processar outro</a></p>', status_code=500)
+
+    if state['status'] != 'done':
+        return HTMLResponse(f"""
+    <html>
+      <head><title>Processando...</title><meta http-equiv="refresh" content="2"></head>
+      <body>
+        <h3>Processando ({state['status']})...</h3>
+        <p>Esta página atualiza sozinha. Job: <code>{job_id}</code></p>
+      </body>
+    </html>
+    """)
+
+    out_path = state['out_path']
+    if state['kind'] == 'split':
+        return HTMLResponse(f"""
+    <html>
+      <head><title>Processamento concluído</title></head>
+      <body>
+        <h3>Processamento concluído</h3>
+        <p>As partes foram escritas em: <code>{html.escape(out_path)}</code></p>
+        <p><a href="/">&larr; Processar outro</a></p>
+      </body>
+    </html>
+    """)
 
     # Render a small result page with download link and a button to process another
     rel = os.path.relpath(out_path, start=os.path.abspath('downloads'))
-    download_url = f'/downloads/{rel}'
-    html = f"""
+    # o nome vem do título digitado: citar na URL e escapar no HTML
+    download_url = '/downloads/' + urllib.parse.quote(Path(rel).as_posix())
+    page = f"""
     <html>
       <head><title>Processamento concluído</title></head>
       <body>
         <h3>Processamento concluído</h3>
-        <p>Arquivo gerado: <a href="{download_url}">{os.path.basename(out_path)}</a></p>
+        <p>Arquivo gerado: <a href="{html.escape(download_url)}">{html.escape(os.path.basename(out_path))}</a></p>
         <p><a href="/">&larr; Processar outro</a></p>
       </body>
     </html>
     """
-    return HTMLResponse(content=html)
+    return HTMLResponse(content=page)
 
 
 @app.post('/split_youtube')
-def split_youtube(background_tasks: BackgroundTasks, url: str = Form(...), parts: int = Form(...), title: str = Form(''), subtitle: str = Form(''),
-                  cookies: str = Form(None), cookies_from_browser: str = Form(None)):
+async def split_youtube(background_tasks: BackgroundTasks, url: str = Form(...), parts: int = Form(...), title: str = Form(''), subtitle: str = Form(''),
+                  cookies: str = Form(None), cookies_file: UploadFile | None = File(None),
+                  cookies_from_browser: str = Form(None)):
     """Endpoint que dispara o processo de dividir/convertir YouTube em background.
 
     Retorna imediatamente um status e escreve resultados em `downloads/youtube/output_videos`.
+    Responde 503 (sem enfileirar) se já houver SPLIT_JOB_LIMIT jobs rodando ou pouca memória livre.
     """
-
+    global _split_running
     # import run_split robustly: try relative, absolute, then load by path as fallback
     def _get_run_split():
         try:
@@ -138,29 +392,54 @@ def split_youtube(background_tasks: BackgroundTasks, url: str = Form(...), parts
 
     run_split = _get_run_split()
     out_dir = 'downloads'
+    parts_dir = str(Path(out_dir) / 'youtube' / 'output_videos')
+    job_id = uuid.uuid4().hex
+    # o upload é salvo antes da checagem: o await dele não pode ficar entre checar e reservar a vaga
+    uploaded = await asyncio.to_thread(_save_upload, cookies_file)
+    cookies = uploaded or cookies
+    busy = _split_busy_reason()
+    if busy:
+        _remove_file(uploaded)
+        return HTMLResponse(f'<h3>Servidor ocupado</h3><p>{busy}. Tente novamente em alguns minutos.</p>'
+                            '<p><a href="/">&larr; Voltar</a></p>', status_code=503, headers={'Retry-After': '60'})
+    # reservar a vaga logo após a checagem (sem await no meio); liberada quando o job termina
+    _split_running += 1
+    try:
+        _create_job(job_id, 'split', out_path=parts_dir)
+    except Exception:
+        _split_running -= 1
+        _remove_file(uploaded)
+        raise
 
-    def job():
+    async def job():
+        global _split_running
+        _update_job(job_id, 'running')
         try:
-            run_split(url, parts=int(parts), title=title or '', subtitle=subtitle or '', out_dir=out_dir,
-                      cookies=cookies or None, cookies_from_browser=cookies_from_browser or None)
+            await asyncio.to_thread(run_split, url, parts=int(parts), title=title or '', subtitle=subtitle or '',
+                                    out_dir=out_dir, cookies=cookies or None,
+                                    cookies_from_browser=cookies_from_browser or None)
         except Exception as e:
-            Path(out_dir).mkdir(parents=True, exist_ok=True)
-            with open(Path(out_dir) / 'error.txt', 'w', encoding='utf-8') as f:
-                f.write(str(e))
+            _update_job(job_id, 'error', error=str(e))
+        else:
+            _update_job(job_id, 'done')
+        finally:
+            _remove_file(uploaded)
+            _split_running -= 1
 
     background_tasks.add_task(job)
     # Return a small HTML page informing the job started and provide a button to process another
-    html = f"""
+    page = f"""
     <html>
       <head><title>Processamento em segundo plano</title></head>
       <body>
         <h3>Processamento iniciado</h3>
-        <p>As partes serão escritas em: <code>{out_dir}/youtube/output_videos</code></p>
+        <p>As partes serão escritas em: <code>{parts_dir}</code></p>
+        <p>Acompanhe em <a href="/status/{job_id}">/status/{job_id}</a></p>
         <p><a href="/">&larr; Processar outro</a></p>
       </body>
     </html>
     """
-    return HTMLResponse(content=html)
+    return HTMLResponse(content=page)
 
 
 @app.get('/health')
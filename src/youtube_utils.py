@@ -3,27 +3,66 @@
 Requirements:
 - yt-dlp (python package)
 - ffmpeg/ffprobe in PATH
+- optional: PyAV (pip install av) to probe files in-process
 
 This module exposes:
 - download_youtube(url, out_dir) -> filepath
+- download_many(urls, out_dir) -> iterator of filepaths (one yt-dlp instance for the batch)
+- download_youtube_many(urls, out_dir, max_workers) -> iterator of (url, filepath), downloaded in parallel
+- probe_all(filepath) -> dict (one cached probe, PyAV or ffprobe, for format + streams)
+- probe_many(paths) -> list of probe_all dicts, with the ffprobe launches batched
 - get_duration_seconds(filepath) -> float
+- get_durations_many(paths) / get_durations_async(paths) -> list of floats, probed concurrently
 """
 from __future__ import annotations
-import json
+import asyncio
+import atexit
 import math
 import os
+import re
+import shelve
+import shutil
 import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import yt_dlp
 import tempfile
 from http.cookiejar import CookieJar
 
+# same spawn flags as the ffmpeg calls: no console window per ffprobe/yt-dlp on Windows, no inherited fds
+from video_processing import _SPAWN_KWARGS
 
-def _export_cookies_from_browser_to_file(browser: str, out_path: Path) -> Path:
+try:
+    # orjson is optional; parses the ffprobe JSON (bytes) faster than the stdlib
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    # PyAV (libav bindings) is optional; probes in-process instead of spawning ffprobe
+    import av
+except ImportError:
+    av = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: only used by split_durations for large part counts
+    np = None
+
+
+# below this many parts the plain Python loop is faster than building NumPy arrays
+_NUMPY_MIN_PARTS = 64
+
+
+def _export_cookies_from_browser_to_file(browser: str) -> Path:
     """Try to extract cookies from the user's browser using browser_cookie3 and
-    write them in Netscape cookie file format to out_path. Returns out_path on success.
+    write them in Netscape cookie file format to a new temporary file. Returns its path on success.
     Raises RuntimeError on failure.
     """
     try:
@@ -43,60 +82,133 @@ def _export_cookies_from_browser_to_file(browser: str, out_path: Path) -> Path:
     except Exception as e:
         raise RuntimeError(f'failed to load cookies from browser "{browser}": {e}')
 
-    # write Netscape format
+    # write Netscape format (domain, flag, path, secure, expires, name, value), built as one string
+    # and written at once; NamedTemporaryFile creates the file atomically (mktemp could race)
     try:
-        with open(out_path, 'w', encoding='utf-8') as fh:
-            fh.write('# Netscape HTTP Cookie File\n')
-            for c in cj:
-                # cookie attributes: domain, flag, path, secure, expires, name, value
-                domain = c.domain
-                flag = 'TRUE' if domain.startswith('.') else 'FALSE'
-                path_c = c.path
-                secure = 'TRUE' if getattr(c, 'secure', False) else 'FALSE'
-                expires = str(int(getattr(c, 'expires', 0) or 0))
-                name = c.name
-                value = c.value
-                fh.write('\t'.join([domain, flag, path_c, secure, expires, name, value]) + '\n')
+        body = ''.join(
+            f"{c.domain}\t{'TRUE' if c.domain.startswith('.') else 'FALSE'}\t{c.path}\t"
+            f"{'TRUE' if c.secure else 'FALSE'}\t{int(c.expires or 0)}\t{c.name}\t{c.value}\n"
+            for c in cj
+        )
+        with tempfile.NamedTemporaryFile('w', prefix='yt_cookies_', suffix='.txt', delete=False,
+                                         encoding='utf-8') as fh:
+            fh.write('# Netscape HTTP Cookie File\n' + body)
     except Exception as e:
         raise RuntimeError(f'failed to write cookies file: {e}')
 
-    return out_path
+    return Path(fh.name)
 
 
-def download_youtube(url: str, out_dir: str | Path, skip_if_exists: bool = True, max_height: Optional[int] = None,
-                     download_archive: Optional[str] = None, cookies: Optional[str] = None,
-                     cookies_from_browser: Optional[str] = None) -> Path:
-    """Download best video+audio merged format via yt-dlp.
+# executables resolved once at import instead of a PATH search per subprocess call
+_FFPROBE = shutil.which('ffprobe') or 'ffprobe'
+_YTDLP = shutil.which('yt-dlp') or 'yt-dlp'
 
-    If skip_if_exists is True the function will attempt to detect an existing
-    downloaded file for the video id and return it without re-downloading.
+# format selectors and the options every download shares, built once
+_FMT_DEFAULT = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best'
+_FMT_MAX_HEIGHT = 'best[height<={h}]+bestaudio/best[height<={h}]'
+_BASE_YDL_OPTS = {
+    'merge_output_format': 'mp4',
+    'noplaylist': True,
+    # do not overwrite by default; we'll control via skip_if_exists
+    'nooverwrites': False,
+    # plain (non-fragmented) HTTPS formats are fetched as 10 MiB range requests; YouTube throttles
+    # one long stream more than many short ones
+    'http_chunk_size': 10 * 1024 * 1024,
+    # only the media file is needed: no side files (info JSON, thumbnail, subtitles), and so none
+    # of the postprocessors that would write or embed them
+    'writeinfojson': False,
+    'writethumbnail': False,
+    'writesubtitles': False,
+    'writeautomaticsub': False,
+}
+# with aria2c installed, yt-dlp hands it the HTTP downloads (16 connections per file)
+if shutil.which('aria2c'):
+    _BASE_YDL_OPTS['external_downloader'] = {'default': 'aria2c'}
+    _BASE_YDL_OPTS['external_downloader_args'] = {'aria2c': ['-x', '16', '-s', '16', '-k', '1M']}
+# directories already created by this process (skips the mkdir syscalls on repeat calls)
+_dirs_created: set[Path] = set()
 
-    max_height: if provided (e.g. 720) will restrict the downloaded video
-    resolution to at most that height to speed up downloads and reduce size.
 
-    Returns path to downloaded file.
+def _ensure_dir(path: Path) -> None:
+    if path not in _dirs_created:
+        path.mkdir(parents=True, exist_ok=True)
+        _dirs_created.add(path)
+
+
+# where each browser keeps its cookie database, as (base, glob) with base 'HOME' or a Windows
+# environment variable; only used to notice that the cookies changed
+_COOKIE_DB_GLOBS = {
+    'chrome': (('HOME', '.config/google-chrome/*/Cookies'), ('HOME', '.config/google-chrome/*/Network/Cookies'),
+               ('HOME', 'Library/Application Support/Google/Chrome/*/Cookies'),
+               ('LOCALAPPDATA', 'Google/Chrome/User Data/*/Network/Cookies')),
+    'chromium': (('HOME', '.config/chromium/*/Cookies'), ('HOME', '.config/chromium/*/Network/Cookies')),
+    'edge': (('HOME', '.config/microsoft-edge/*/Cookies'), ('HOME', 'Library/Application Support/Microsoft Edge/*/Cookies'),
+             ('LOCALAPPDATA', 'Microsoft/Edge/User Data/*/Network/Cookies')),
+    'firefox': (('HOME', '.mozilla/firefox/*/cookies.sqlite'),
+                ('HOME', 'Library/Application Support/Firefox/Profiles/*/cookies.sqlite'),
+                ('APPDATA', 'Mozilla/Firefox/Profiles/*/cookies.sqlite')),
+}
+_COOKIE_DB_GLOBS['ff'] = _COOKIE_DB_GLOBS['firefox']
+# without a known cookie database, an export is reused for this long
+_COOKIE_EXPORT_TTL = 600
+# (browser, database mtime or TTL bucket) -> exported cookie file
+_COOKIE_CACHE: dict[tuple, Path] = {}
+_cookie_cache_lock = threading.Lock()
+
+
+def _cookie_db_mtime(browser: str) -> Optional[int]:
+    """Newest mtime_ns among the browser's cookie databases, or None if none was found."""
+    mtimes = []
+    for base, pattern in _COOKIE_DB_GLOBS.get(browser.lower(), ()):
+        root = Path.home() if base == 'HOME' else os.environ.get(base)
+        if not root:
+            continue
+        for db in Path(root).glob(pattern):
+            try:
+                mtimes.append(db.stat().st_mtime_ns)
+            except OSError:
+                pass
+    return max(mtimes, default=None)
+
+
+def _cookies_file_for_browser(browser: str) -> Path:
+    """Exported cookie file for `browser`, reused until the browser's cookie database changes.
+
+    browser_cookie3 opens and decrypts the whole database, so in a batch (or repeated requests)
+    the export runs once. Exported files are removed when the process exits.
     """
-    out_dir = Path(out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
+    mtime = _cookie_db_mtime(browser)
+    key = (browser.lower(), mtime if mtime is not None else int(time.time() // _COOKIE_EXPORT_TTL))
+    with _cookie_cache_lock:
+        path = _COOKIE_CACHE.get(key)
+        if path is not None and path.exists():
+            return path
+        path = _export_cookies_from_browser_to_file(browser)
+        _COOKIE_CACHE[key] = path
+    atexit.register(_remove_quietly, path)
+    return path
+
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
 
+def _build_ydl_opts(out_dir: Path, max_height: Optional[int] = None, download_archive: Optional[str] = None,
+                    cookies: Optional[str] = None, cookies_from_browser: Optional[str] = None) -> tuple[dict, str, Optional[str]]:
+    """Build the yt-dlp options shared by download_youtube and download_many.
+
+    Returns (ydl_opts, format string, cookies file path or None).
+    """
     # choose format string, optionally limit height
-    if max_height:
-        fmt = f"best[height<={max_height}]+bestaudio/best[height<={max_height}]"
-    else:
-        fmt = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best'
-
-    ydl_opts = {
-        'format': fmt,
-        'outtmpl': str(out_dir / '%(id)s.%(ext)s'),
-        'merge_output_format': 'mp4',
-        'noplaylist': True,
-        # do not overwrite by default; we'll control via skip_if_exists
-        'nooverwrites': False,
-    }
+    fmt = _FMT_MAX_HEIGHT.format(h=max_height) if max_height else _FMT_DEFAULT
+    ydl_opts = {**_BASE_YDL_OPTS, 'format': fmt, 'outtmpl': f'{out_dir}{os.sep}%(id)s.%(ext)s'}
     if download_archive:
         # ensure archive directory exists
         try:
-            Path(download_archive).parent.mkdir(parents=True, exist_ok=True)
+            _ensure_dir(Path(download_archive).parent)
         except Exception:
             pass
         ydl_opts['download_archive'] = str(download_archive)
@@ -106,9 +218,7 @@ def download_youtube(url: str, out_dir: str | Path, skip_if_exists: bool = True,
     # internal cookies-from-browser handling.
     if cookies_from_browser and not cookies:
         try:
-            tf = Path(tempfile.mktemp(prefix='yt_cookies_', suffix='.txt'))
-            _export_cookies_from_browser_to_file(cookies_from_browser, tf)
-            cookies = str(tf)
+            cookies = str(_cookies_file_for_browser(cookies_from_browser))
             # prefer cookiefile path
             ydl_opts['cookiefile'] = cookies
         except Exception as e:
@@ -119,99 +229,448 @@ def download_youtube(url: str, out_dir: str | Path, skip_if_exists: bool = True,
         if cookies:
             # explicit cookie file (Netscape format)
             ydl_opts['cookiefile'] = str(cookies)
+    return ydl_opts, fmt, cookies
+
 
-    # Try to inspect info to get video id and expected filename without forcing a download
-    with yt_dlp.YoutubeDL({'noplaylist': True, 'quiet': True}) as ydl:
+# YoutubeDL instances reused across calls with identical options: building one loads every extractor
+# and the cookie jar. A YoutubeDL is not safe for concurrent use, so each has its own lock.
+_YDL_POOL_MAX = 8
+_YDL_POOL: OrderedDict[frozenset, tuple[yt_dlp.YoutubeDL, threading.Lock]] = OrderedDict()
+_ydl_pool_lock = threading.Lock()
+
+
+@contextmanager
+def _pooled_ydl(opts: dict) -> Iterator[yt_dlp.YoutubeDL]:
+    """Yield the pooled YoutubeDL for `opts` (created on first use), held exclusively by the caller.
+
+    If another thread is using the pooled instance, a private one is built for this call instead
+    of waiting, so parallel downloads (download_youtube_many) are not serialized on the pool.
+    Options with a `cookiefile` are never pooled: close() writes the cookie jar back to that path,
+    and a pooled instance would do it after the caller (or the atexit cleanup) deleted the file.
+    """
+    if 'cookiefile' in opts:
+        with yt_dlp.YoutubeDL(opts) as private:
+            yield private
+        return
+    # some option values are dicts/lists (external_downloader), so key on their repr
+    key = frozenset((k, repr(v)) for k, v in opts.items())
+    evicted = None
+    with _ydl_pool_lock:
+        entry = _YDL_POOL.get(key)
+        if entry is None:
+            entry = _YDL_POOL[key] = (yt_dlp.YoutubeDL(opts), threading.Lock())
+            if len(_YDL_POOL) > _YDL_POOL_MAX:
+                _, evicted = _YDL_POOL.popitem(last=False)
+        else:
+            _YDL_POOL.move_to_end(key)
+    if evicted is not None:
+        # close the least recently used instance once nobody is using it
+        old_ydl, old_lock = evicted
+        with old_lock:
+            old_ydl.close()
+    ydl, lock = entry
+    if not lock.acquire(blocking=False):
+        with yt_dlp.YoutubeDL(opts) as private:
+            yield private
+        return
+    try:
+        yield ydl
+    finally:
+        lock.release()
+
+
+@atexit.register
+def _close_ydl_pool() -> None:
+    """Close the pooled instances at interpreter exit (flushes cookie jars, closes connections)."""
+    with _ydl_pool_lock:
+        entries = list(_YDL_POOL.values())
+        _YDL_POOL.clear()
+    for ydl, _ in entries:
         try:
-            info = ydl.extract_info(url, download=False)
+            ydl.close()
         except Exception:
-            info = None
+            pass
+
+
+# small on-disk cache (per download dir) of the id/ext yt-dlp reported for each URL
+_INFO_CACHE_NAME = '.info_cache'
+_info_cache_lock = threading.Lock()
+
+
+def _cached_info(out_dir: Path, url: str) -> Optional[dict]:
+    """Return the cached {'id', 'ext', 'ts'} for `url`, or None."""
+    try:
+        with _info_cache_lock, shelve.open(str(out_dir / _INFO_CACHE_NAME), flag='r') as db:
+            return db.get(url)
+    except Exception:
+        # missing or unreadable cache: behave as a miss
+        return None
+
+
+def _store_info(out_dir: Path, url: str, info: dict) -> None:
+    try:
+        with _info_cache_lock, shelve.open(str(out_dir / _INFO_CACHE_NAME)) as db:
+            db[url] = {'id': info.get('id'), 'ext': info.get('ext', 'mp4'), 'ts': time.time()}
+    except Exception as e:
+        print('youtube_utils: failed to update the info cache:', e)
+
 
-    if info and skip_if_exists:
-        vid = info.get('id')
-        # check common extensions (.mp4, .mkv, .webm, original ext)
-        candidates = [out_dir / f"{vid}.mp4", out_dir / f"{vid}.mkv", out_dir / f"{vid}.webm", out_dir / f"{vid}.{info.get('ext', 'mp4')}" ]
-        for c in candidates:
-            if c.exists():
-                print('download_youtube: arquivo já existe, pulando download ->', c)
-                return c
+# the 11-character video id of the common YouTube URL shapes (watch?v=, youtu.be/, shorts/, embed/)
+_YT_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])')
+
+
+def _local_download(out_dir: Path, url: str) -> Optional[Path]:
+    """Find an existing download for `url` without yt-dlp: id parsed from the URL, else the info cache."""
+    m = _YT_ID_RE.search(url)
+    info = {'id': m.group(1)} if m else _cached_info(out_dir, url)
+    return _existing_download(out_dir, info) if info else None
+
+
+# last directory listing taken by _listing: ((dir, dir mtime_ns), set of names)
+_last_listing: tuple[tuple[str, int], frozenset[str]] = (('', 0), frozenset())
+
+
+def _listing(out_dir: Path) -> frozenset[str]:
+    """Names in out_dir from one scandir, reused while the directory's mtime is unchanged
+    (adding or removing a file updates it), so a batch of skip checks lists the directory once."""
+    global _last_listing
+    try:
+        key = (str(out_dir), os.stat(out_dir).st_mtime_ns)
+    except OSError:
+        return frozenset()
+    cached_key, names = _last_listing
+    if cached_key != key:
+        with os.scandir(out_dir) as it:
+            names = frozenset(e.name for e in it)
+        _last_listing = (key, names)
+    return names
+
+
+def _existing_download(out_dir: Path, info: dict) -> Optional[Path]:
+    """Return an already-downloaded file for the video described by `info`, if any."""
+    vid = info.get('id')
+    names = _listing(out_dir)
+    # check common extensions (.mp4, .mkv, .webm, original ext)
+    for ext in ('mp4', 'mkv', 'webm', info.get('ext', 'mp4')):
+        name = f'{vid}.{ext}'
+        if name in names:
+            return out_dir / name
+    return None
+
+
+def _downloaded_filename(ydl, info: dict) -> Path:
+    filename = ydl.prepare_filename(info)
+    # yt-dlp may produce merged file with .mp4 extension
+    if not Path(filename).exists():
+        # try mp4
+        base = Path(filename).with_suffix('.mp4')
+        if base.exists():
+            filename = str(base)
+    return Path(filename)
+
+
+def download_youtube(url: str, out_dir: str | Path, skip_if_exists: bool = True, max_height: Optional[int] = None,
+                     download_archive: Optional[str] = None, cookies: Optional[str] = None,
+                     cookies_from_browser: Optional[str] = None, concurrent_fragments: int = 8) -> Path:
+    """Download best video+audio merged format via yt-dlp.
+
+    If skip_if_exists is True the function will attempt to detect an existing
+    downloaded file for the video id and return it without re-downloading.
+
+    max_height: if provided (e.g. 720) will restrict the downloaded video
+    resolution to at most that height to speed up downloads and reduce size.
+
+    concurrent_fragments: parallel connections for fragmented formats (DASH/HLS).
+
+    Returns path to downloaded file.
+    """
+    out_dir = Path(out_dir)
+    _ensure_dir(out_dir)
+    # a file already on disk is found without any network round-trip
+    if skip_if_exists:
+        existing = _local_download(out_dir, url)
+        if existing:
+            print('download_youtube: arquivo já existe, pulando download ->', existing)
+            return existing
+
+    ydl_opts, fmt, cookies = _build_ydl_opts(out_dir, max_height, download_archive, cookies, cookies_from_browser)
 
     # perform download using the Python API; if it fails (often due to cookies-from-browser
     # extraction issues) fallback to calling the yt-dlp CLI which sometimes behaves more
     # robustly in environments where the API extraction raises internal errors.
     ydl_opts['nooverwrites'] = True if skip_if_exists else False
+    ydl_opts['concurrent_fragment_downloads'] = concurrent_fragments
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            # yt-dlp may produce merged file with .mp4 extension
-            if not Path(filename).exists():
-                # try mp4
-                base = Path(filename).with_suffix('.mp4')
-                if base.exists():
-                    filename = str(base)
-        return Path(filename)
+        # one YoutubeDL (cookies, connections) for both the info probe and the download, reused by
+        # later calls with the same options
+        with _pooled_ydl(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            _store_info(out_dir, url, info)
+            if skip_if_exists:
+                existing = _existing_download(out_dir, info)
+                if existing:
+                    print('download_youtube: arquivo já existe, pulando download ->', existing)
+                    return existing
+            info = ydl.process_ie_result(info, download=True)
+            return _downloaded_filename(ydl, info)
     except Exception as e:
         # Fallback: call yt-dlp CLI with similar options
         print('youtube_utils: Python API download failed, falling back to yt-dlp CLI:', e)
-        cli_cmd = ['yt-dlp', '--no-playlist', '-f', fmt, '-o', str(out_dir / '%(id)s.%(ext)s'), '--merge-output-format', 'mp4']
-        if download_archive:
-            cli_cmd += ['--download-archive', str(download_archive)]
+        cli_cmd = [_YTDLP, '--no-playlist', '-f', fmt, '-o', str(out_dir / '%(id)s.%(ext)s'), '--merge-output-format', 'mp4',
+                   '-N', str(concurrent_fragments), '--http-chunk-size', '10M', '--no-write-info-json',
+                   '--no-write-thumbnail', '--no-write-subs', '--no-write-auto-subs']
+        if 'external_downloader' in _BASE_YDL_OPTS:
+            cli_cmd += ['--downloader', 'aria2c', '--downloader-args', 'aria2c:-x 16 -s 16 -k 1M']
         if skip_if_exists:
-            cli_cmd += ['--no-overwrites']
-        if cookies:
-            cli_cmd += ['--cookies', str(cookies)]
-        if cookies_from_browser:
-            cli_cmd += ['--cookies-from-browser', str(cookies_from_browser)]
-        # run CLI and capture output
-        import subprocess
-        proc = subprocess.run(cli_cmd + [url], capture_output=True, text=True)
+            cli_cmd.append('--no-overwrites')
+        # options with a value, passed only when set
+        valued = (('--download-archive', download_archive), ('--cookies', cookies),
+                  ('--cookies-from-browser', cookies_from_browser))
+        cli_cmd.extend(arg for flag, value in valued if value for arg in (flag, str(value)))
+        cli_cmd.append(url)
+        # the progress output on stdout is not read: only stderr (errors) is captured
+        proc = subprocess.run(cli_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace',
+                              **_SPAWN_KWARGS)
         if proc.returncode != 0:
-            raise RuntimeError(f"yt-dlp CLI failed:\nSTDOUT:{proc.stdout}\nSTDERR:{proc.stderr}")
+            raise RuntimeError(f"yt-dlp CLI failed:\nSTDERR:{proc.stderr}")
 
-        # pick the newest file in out_dir as the downloaded file (best-effort)
-        candidates = list(out_dir.glob('*'))
-        if not candidates:
+        # pick the newest file in out_dir as the downloaded file (best-effort): one scandir pass
+        with os.scandir(out_dir) as it:
+            newest = max((e for e in it if e.is_file() and not e.name.startswith(_INFO_CACHE_NAME)),
+                         key=lambda e: e.stat().st_mtime, default=None)
+        if newest is None:
             raise RuntimeError('yt-dlp CLI reported success but no file found in out_dir')
-        candidates.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-        return candidates[0]
+        return Path(newest.path)
+
+
+def download_many(urls: list[str], out_dir: str | Path, skip_if_exists: bool = True, max_height: Optional[int] = None,
+                  download_archive: Optional[str] = None, cookies: Optional[str] = None,
+                  cookies_from_browser: Optional[str] = None, concurrent_fragments: int = 8) -> Iterator[Path]:
+    """Download several URLs through one (pooled) YoutubeDL instance, yielding each path in order.
+
+    Options (and browser cookies) are prepared once for the whole batch, and fragmented
+    formats (DASH/HLS) are fetched with `concurrent_fragments` parallel connections.
+    Being a generator, callers can start processing a file while the next one downloads.
+    A URL that fails here is retried through download_youtube (which has the CLI fallback).
+    """
+    out_dir = Path(out_dir)
+    _ensure_dir(out_dir)
+    ydl_opts, _, cookies = _build_ydl_opts(out_dir, max_height, download_archive, cookies, cookies_from_browser)
+    ydl_opts['concurrent_fragment_downloads'] = concurrent_fragments
+    ydl_opts['nooverwrites'] = bool(skip_if_exists)
+    for url in urls:
+        existing = _local_download(out_dir, url) if skip_if_exists else None
+        if existing:
+            print('download_many: arquivo já existe, pulando download ->', existing)
+            yield existing
+            continue
+        try:
+            # the instance is only held while this URL downloads, never across a yield
+            with _pooled_ydl(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+                _store_info(out_dir, url, info)
+                existing = _existing_download(out_dir, info) if skip_if_exists else None
+                if not existing:
+                    info = ydl.process_ie_result(info, download=True)
+                    path = _downloaded_filename(ydl, info)
+            if existing:
+                print('download_many: arquivo já existe, pulando download ->', existing)
+                yield existing
+                continue
+        except Exception as e:
+            print('download_many: falha no download em lote, tentando individualmente:', e)
+            path = download_youtube(url, out_dir, skip_if_exists=skip_if_exists, max_height=max_height,
+                                    download_archive=download_archive, cookies=cookies,
+                                    concurrent_fragments=concurrent_fragments)
+        yield path
+
+
+def download_youtube_many(urls: list[str], out_dir: str | Path, max_workers: int = 4,
+                          **kwargs) -> Iterator[tuple[str, Path]]:
+    """Download several URLs in parallel, yielding (url, path) as each download finishes.
+
+    Each URL goes through download_youtube (same options via `kwargs`, including a shared
+    `download_archive`, which yt-dlp locks while writing) on a thread pool of `max_workers`.
+    Unlike download_many, which keeps a single connection busy at a time, this overlaps the
+    network waits of independent videos. Browser cookies are exported once for the whole batch.
+    """
+    out_dir = Path(out_dir)
+    _ensure_dir(out_dir)
+    if kwargs.get('cookies_from_browser') and not kwargs.get('cookies'):
+        _, _, cookies = _build_ydl_opts(out_dir, cookies_from_browser=kwargs['cookies_from_browser'])
+        if cookies:
+            kwargs = {**kwargs, 'cookies': cookies, 'cookies_from_browser': None}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls) or 1))) as executor:
+        futures = {executor.submit(download_youtube, url, out_dir, **kwargs): url for url in urls}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+# parsed probes per (path, mtime_ns, size), LRU; a changed file gets a new key. Filled by both
+# probe_all and probe_many
+_PROBE_CACHE_MAX = 256
+_PROBE_CACHE: OrderedDict[tuple[str, int, int], dict] = OrderedDict()
+_probe_cache_lock = threading.Lock()
+# ffprobe processes started at once by probe_many
+_PROBE_BATCH = 16
+
+
+def _probe_key(filepath: str | Path) -> tuple[str, int, int]:
+    st = os.stat(filepath)
+    return str(filepath), st.st_mtime_ns, st.st_size
+
+
+def _cache_probe(key: tuple[str, int, int], info: dict) -> dict:
+    with _probe_cache_lock:
+        _PROBE_CACHE[key] = info
+        if len(_PROBE_CACHE) > _PROBE_CACHE_MAX:
+            _PROBE_CACHE.popitem(last=False)
+    return info
+
+
+def _cached_probe(key: tuple[str, int, int]) -> Optional[dict]:
+    with _probe_cache_lock:
+        info = _PROBE_CACHE.get(key)
+        if info is not None:
+            _PROBE_CACHE.move_to_end(key)
+        return info
+
+
+def probe_all(filepath: str | Path) -> dict:
+    """Probe the file once and return ffprobe-style {'format': ..., 'streams': [...]}.
+
+    Uses PyAV in-process when installed, otherwise one ffprobe (-show_format -show_streams).
+    Callers pick what they need (duration, size, codecs...) from the same probe. Results are
+    cached per (path, mtime, size), so an unchanged file is never probed twice.
+    """
+    key = _probe_key(filepath)
+    info = _cached_probe(key)
+    if info is None:
+        info = _cache_probe(key, _probe(key[0]))
+    return info
+
+
+def probe_many(paths: list[str | Path]) -> list[dict]:
+    """probe_all for several files, same order as `paths`.
+
+    ffprobe takes a single input, so without PyAV the uncached files are probed by starting up
+    to _PROBE_BATCH ffprobe processes at once and only then collecting their output: the process
+    launches overlap instead of each one waiting for the previous to finish.
+    """
+    keys = [_probe_key(p) for p in paths]
+    missing = list(dict.fromkeys(k for k in keys if _cached_probe(k) is None))
+    if av is not None:
+        for key in missing:
+            _cache_probe(key, _probe(key[0]))
+    else:
+        for i in range(0, len(missing), _PROBE_BATCH):
+            batch = missing[i:i + _PROBE_BATCH]
+            procs = []
+            try:
+                for key in batch:
+                    procs.append(subprocess.Popen(_ffprobe_cmd(key[0]), stdout=subprocess.PIPE,
+                                                  stderr=subprocess.PIPE, **_SPAWN_KWARGS))
+                for key, proc in zip(batch, procs):
+                    out, err = proc.communicate()
+                    _cache_probe(key, _parse_ffprobe(proc.returncode, out, err))
+            finally:
+                # a failed probe (or launch) raises mid-batch: do not leave the rest running
+                for proc in procs:
+                    if proc.returncode is None:
+                        proc.kill()
+                        proc.communicate()
+    return [_cached_probe(k) or probe_all(k[0]) for k in keys]
+
+
+def _pyav_probe(filepath: str) -> dict:
+    """The subset of ffprobe's JSON that callers read, built with PyAV."""
+    with av.open(filepath) as container:
+        streams = []
+        for s in container.streams:
+            if s.type == 'video':
+                streams.append({'codec_type': 'video', 'codec_name': s.codec_context.name,
+                                'width': s.codec_context.width, 'height': s.codec_context.height})
+            elif s.type == 'audio':
+                streams.append({'codec_type': 'audio', 'codec_name': s.codec_context.name})
+        duration = container.duration / av.time_base if container.duration else None
+        return {'format': {'format_name': container.format.name, 'duration': duration}, 'streams': streams}
+
+
+def _ffprobe_cmd(filepath: str) -> list[str]:
+    return [_FFPROBE, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', filepath]
+
+
+def _parse_ffprobe(returncode: int, out: bytes, err: bytes) -> dict:
+    if returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {err.decode(errors='replace')}")
+    return _json_loads(out)
+
+
+def _probe(filepath: str) -> dict:
+    if av is not None:
+        try:
+            info = _pyav_probe(filepath)
+        except Exception:
+            # unreadable by PyAV (or an old build): let ffprobe try
+            info = None
+        # no container duration (some streamed/fragmented files): ffprobe also reads it from the streams
+        if info is not None and info['format']['duration'] is not None:
+            return info
+    proc = subprocess.run(_ffprobe_cmd(filepath), stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_SPAWN_KWARGS)
+    return _parse_ffprobe(proc.returncode, proc.stdout, proc.stderr)
 
 
 def get_duration_seconds(filepath: str | Path) -> float:
-    """Use ffprobe to get duration in seconds (float)."""
-    filepath = str(filepath)
-    cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'json',
-        filepath,
-    ]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError(f"ffprobe failed: {proc.stderr}")
-    data = json.loads(proc.stdout)
-    duration = float(data['format']['duration'])
-    return duration
+    """Duration in seconds (float), from the cached probe_all result (PyAV or ffprobe)."""
+    try:
+        return float(probe_all(filepath)['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        raise RuntimeError(f'ffprobe returned no duration for {filepath}')
+
+
+async def get_durations_async(paths: list[str | Path]) -> list[float]:
+    """Durations of many files, probed concurrently; same order as `paths`.
+
+    Each probe runs get_duration_seconds in a worker thread (the ffprobe subprocess releases the
+    GIL while it runs), so the launches overlap and the (path, mtime, size) cache is shared.
+    """
+    return await asyncio.gather(*(asyncio.to_thread(get_duration_seconds, p) for p in paths))
+
+
+def get_durations_many(paths: list[str | Path]) -> list[float]:
+    """Blocking variant of get_durations_async, for callers without an event loop (uses probe_many)."""
+    durations = []
+    for path, info in zip(paths, probe_many(paths)):
+        try:
+            durations.append(float(info['format']['duration']))
+        except (KeyError, TypeError, ValueError):
+            raise RuntimeError(f'ffprobe returned no duration for {path}')
+    return durations
+
+
+def get_video_size(filepath: str | Path) -> tuple[int, int]:
+    """(width, height) of the first video stream, from the cached probe_all result."""
+    for stream in probe_all(filepath).get('streams', []):
+        if stream.get('codec_type') == 'video':
+            return int(stream['width']), int(stream['height'])
+    raise RuntimeError(f'no video stream in {filepath}')
 
 
 def split_durations(total_seconds: float, parts: int) -> list[tuple[float, float]]:
     """Return list of (start, duration) tuples dividing total_seconds into parts as evenly as possible.
 
-    The last part may include the remainder.
+    Starts are rounded to milliseconds first and each duration runs to the next rounded start (the
+    last one to total_seconds), so consecutive parts meet exactly and the last absorbs the
+    remainder. With NumPy installed, large part counts are computed vectorized.
     """
     if parts <= 0:
         raise ValueError('parts must be >= 1')
-    base = total_seconds / parts
-    ranges = []
-    for i in range(parts):
-        start = i * base
-        # last part: ensure end equals total_seconds
-        if i == parts - 1:
-            duration = total_seconds - start
-        else:
-            duration = base
-        ranges.append((start, duration))
+    if np is not None and parts >= _NUMPY_MIN_PARTS:
+        starts = np.round(np.arange(parts) * (total_seconds / parts), 3)
+        durations = np.round(np.diff(np.append(starts, total_seconds)), 3)
+        return list(zip(starts.tolist(), durations.tolist()))
+    step = total_seconds / parts
+    starts = [round(i * step, 3) for i in range(parts)]
+    ends = starts[1:] + [total_seconds]
     # normalize tiny floating errors
-    ranges = [(round(s, 3), round(d, 3)) for s, d in ranges]
-    return ranges
+    return [(s, round(e - s, 3)) for s, e in zip(starts, ends)]
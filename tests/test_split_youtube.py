@@ -0,0 +1,56 @@
+"""Regression tests for src/split_youtube.py (ffmpeg/ffprobe replaced by fakes, nothing is encoded)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC))
+
+pytest.importorskip('yt_dlp')
+import split_youtube  # noqa: E402
+import video_processing  # noqa: E402
+
+
+def test_single_split_module():
+    # one split_youtube.py: a stale copy on sys.path would shadow it
+    assert split_youtube.run_split.__module__ == 'split_youtube'
+    assert sorted(p.name for p in SRC.glob('split_youtube*.py')) == ['split_youtube.py']
+    assert split_youtube.extract_segment_reencode is video_processing.extract_segment_reencode
+
+
+def test_part_falls_back_to_exact_reencode(tmp_path, monkeypatch):
+    src = tmp_path / 'source.mp4'
+    src.write_bytes(b'not a video')
+    calls = []
+
+    def fake_split(*args, **kwargs):
+        raise RuntimeError('segment muxer failed')
+
+    def fake_annotate(input_path, out_path, segment=None, **kwargs):
+        if segment is not None:
+            raise RuntimeError('pipe failed')
+        calls.append(('convert', Path(input_path).name))
+        Path(out_path).write_bytes(b'part')
+
+    def fake_reencode(input_path, start, duration, out_path, threads=None):
+        calls.append(('reencode', start, duration))
+        Path(out_path).write_bytes(b'segment')
+
+    def no_keyframes(path):
+        raise RuntimeError('no ffprobe')
+
+    monkeypatch.setattr(split_youtube, 'get_duration_seconds', lambda path: 30.0)
+    monkeypatch.setattr(split_youtube, 'get_video_size', lambda path: (1280, 720))
+    monkeypatch.setattr(split_youtube, 'probe_keyframes', no_keyframes)
+    monkeypatch.setattr(split_youtube, 'convert_and_split', fake_split)
+    monkeypatch.setattr(split_youtube, 'convert_and_annotate', fake_annotate)
+    monkeypatch.setattr(split_youtube, 'extract_segment_reencode', fake_reencode)
+
+    split_youtube.run_split('unused', parts=3, title='t', out_dir=tmp_path, src_path=src, tmp_dir=tmp_path / 'tmp')
+
+    out = tmp_path / 'youtube' / 'output_videos'
+    assert sorted(p.name for p in out.glob('*.mp4')) == ['t_parte_1.mp4', 't_parte_2.mp4', 't_parte_3.mp4']
+    assert sorted(c for c in calls if c[0] == 'reencode') == [('reencode', 0.0, 10.0), ('reencode', 10.0, 10.0),
+                                                            ('reencode', 20.0, 10.0)]
+    assert calls.count(('convert', 'segment_1.mp4')) == 1